@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+"""Micro-benchmark of per-disk frame computations.
+
+Compares SVD based `null_space` frames with closed-form `orthonormal_basis`
+and cross products for the work done per fitted disk: perpendicular vector of
+`Disk`, base vectors of its `Plane` and radius vectors against previous disk.
+
+Usage:
+  bench_linalg.py [-n <repeats>]
+
+Options:
+  -h --help         Show this help.
+  -n <repeats>      Number of random disks [default: 10000].
+
+"""
+
+import os
+import sys
+import timeit
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from docopt import docopt
+from linalg import *
+
+
+def frame_svd(n1, n2):
+    perpen = null_space(np.array([n1, null_vec, null_vec]))
+    v1 = normalize(null_space(np.array([n1, null_vec, null_vec])))
+    v2 = normalize(null_space(np.array([n1, v1, null_vec])))
+    normal = null_space(np.array([n1, n2, null_vec]))
+    seg_dir1 = null_space(np.array([n1, normal, null_vec]))
+    seg_dir2 = null_space(np.array([n2, normal, null_vec]))
+    return perpen, v1, v2, seg_dir1, seg_dir2
+
+def frame_closed_form(n1, n2):
+    perpen = orthogonal_vector(n1)
+    v1, v2 = orthonormal_basis(n1)
+    normal = plane_normal(n1, n2)
+    seg_dir1 = cross(n1, normal)
+    seg_dir2 = cross(n2, normal)
+    return perpen, v1, v2, seg_dir1, seg_dir2
+
+
+if __name__ == '__main__':
+    arguments = docopt(__doc__)
+    repeats = int(arguments["-n"])
+
+    rng = np.random.RandomState(0)
+    normals = rng.normal(size=(repeats + 1, 3))
+    normals /= np.sqrt((normals ** 2).sum(axis=1))[:, np.newaxis]
+    pairs = zip(normals[:-1], normals[1:])
+
+    for name, fun in [("svd", frame_svd), ("closed-form", frame_closed_form)]:
+        elapsed = min(timeit.repeat(lambda: [fun(n1, n2) for n1, n2 in pairs],
+                                    repeat=3, number=1))
+        print "{:>12}: {:.2f} us per disk".format(name, elapsed / repeats * 1e6)
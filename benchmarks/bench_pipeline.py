@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+"""Benchmark of the digging pipeline on synthetic tunnels.
+
+Times single calls of `Tunnel.fit_disk`, `Tunnel.find_minimal_disk`,
+`TunnelCurve.get_weighted_dir` and `TunnelCurve.pass_through_disk` in tunnel
+centers sampled evenly along tunnels of various shapes and sizes, and the
+whole `dig_tunnel` on tunnels not larger than --dig-max. Results can be
+stored in JSON and compared with results stored earlier, e.g. by previous
+version.
+
+Usage:
+  bench_pipeline.py [--shapes <names>] [--sizes <sizes>] [--samples <n>] [--dig-max <n>] [-o <json>] [--baseline <json>]
+
+Options:
+  -h --help                         Show this help.
+  --shapes <names>                  Comma separated tunnel shapes, see synthetic.py
+                                    [default: straight,helix,sharp-turn,bottleneck].
+  --sizes <sizes>                   Comma separated numbers of spheres
+                                    [default: 50,200,1000,5000,20000].
+  --samples <n>                     Number of tunnel centers sampled for single call
+                                    benchmarks [default: 20].
+  --dig-max <n>                     Number of spheres of the largest tunnel dug
+                                    completely [default: 200].
+  -o <json>                         Store results to given file.
+  --baseline <json>                 Compare results with results stored earlier.
+
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from docopt import docopt
+from digger import *
+from synthetic import generate_tunnel
+
+
+# Mean wall time of `fun` called with every item of `args`. Output of `fun`
+# is discarded.
+def time_calls(fun, args):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        start = time.time()
+        for arg in args:
+            fun(*arg)
+        elapsed = time.time() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return elapsed / max(len(args), 1)
+
+# Curve with directions of segments between tunnel centers instead of
+# computed directions of minimal disks, which would take too long for large
+# tunnels. Its cost of weighted directions and pass-through tests is the same.
+def get_bench_curve(tunnel):
+    curve = TunnelCurve.centerline(tunnel)
+    curve.delta = 6.
+    curve.dirs  = [normalize(d) for d in curve._seg_dirs]
+    curve._dirs = np.array(curve.dirs)
+    return curve
+
+def bench_tunnel(shape, n, samples, dig_max):
+    centers, radii = generate_tunnel(shape, n)
+    tunnel = Tunnel()
+    tunnel.load_from_arrays(centers, radii)
+    curve  = get_bench_curve(tunnel)
+
+    idxs    = np.linspace(0, n - 2, samples).astype(int)
+    normals = curve._dirs
+    results = {}
+    results["fit_disk"] = time_calls(tunnel.fit_disk,
+        [(normals[i], centers[i]) for i in idxs])
+    results["find_minimal_disk"] = time_calls(tunnel.find_minimal_disk,
+        [(centers[i], normals[i], curve) for i in idxs[::4]])
+    results["get_weighted_dir"] = time_calls(curve.get_weighted_dir,
+        [(i, 0.5 * curve._seg_lens[i]) for i in idxs])
+
+    disks = [tunnel.fit_disk(normals[i], centers[i]) for i in idxs]
+    results["pass_through_disk"] = time_calls(curve.pass_through_disk,
+        [(disk,) for disk in disks])
+
+    if n <= dig_max:
+        opts = DigOpts(0.3, None, n_workers=1, use_cache=False)
+        results["dig_tunnel"] = time_calls(dig_tunnel, [(tunnel, opts)])
+    return results
+
+def get_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    arguments = docopt(__doc__)
+    shapes  = arguments["--shapes"].split(",")
+    sizes   = [int(size) for size in arguments["--sizes"].split(",")]
+    samples = int(arguments["--samples"])
+    dig_max = int(arguments["--dig-max"])
+
+    baseline = {}
+    if arguments["--baseline"]:
+        with open(arguments["--baseline"]) as infile:
+            baseline = json.load(infile)["results"]
+
+    results = {}
+    print "{:<36} {:>12} {:>12} {:>8}".format("benchmark", "time [ms]",
+                                              "baseline", "ratio")
+    for shape in shapes:
+        for n in sizes:
+            tunnel_results = bench_tunnel(shape, n, samples, dig_max)
+            for name, seconds in sorted(tunnel_results.iteritems()):
+                key = "{}/{}/{}".format(shape, n, name)
+                results[key] = seconds
+                line = "{:<36} {:>12.3f}".format(key, seconds * 1e3)
+                if key in baseline:
+                    line += " {:>12.3f} {:>8.2f}".format(baseline[key] * 1e3,
+                                                        seconds / baseline[key])
+                print line
+                sys.stdout.flush()
+
+    if arguments["-o"]:
+        with open(arguments["-o"], "w") as outfile:
+            json.dump({"revision" : get_revision(),
+                       "date"     : time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "results"  : results}, outfile, indent=2, sort_keys=True)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+"""Generator of synthetic tunnels for benchmarks.
+
+Tunnel is a chain of overlapping spheres, consecutive centers being
+`spacing` apart along the tunnel axis. Radii change slowly, so that no sphere
+contains another one.
+
+Usage:
+  synthetic.py <shape> <n> <out-filename> [--spacing <spacing>]
+
+Options:
+  -h --help                         Show this help.
+  <shape>                           One of straight, helix, sharp-turn, bottleneck.
+  <n>                               Number of spheres.
+  <out-filename>                    Output file in PDB format.
+  --spacing <spacing>               Distance of consecutive centers [default: 0.4].
+
+"""
+
+import math
+import numpy as np
+
+
+# Axes of tunnels as functions of length parameter `s` (array), roughly
+# proportional to arc length, and total `length` of the tunnel. Axes are
+# resampled by arc length afterwards.
+def straight_axis(s, length):
+    return np.column_stack((s, 0.3 * np.sin(s / 5.), 0.2 * np.cos(s / 7.)))
+
+def helix_axis(s, length):
+    radius, pitch = 4., 1.5
+    k = math.sqrt(radius ** 2 + pitch ** 2)
+    return np.column_stack((radius * np.cos(s / k), radius * np.sin(s / k),
+                            pitch * s / k))
+
+# Straight tunnel turning by 90 degrees in the middle along a tight arc.
+def sharp_turn_axis(s, length):
+    middle, bend = length / 2., 1.
+    arc_len = bend * math.pi / 2.
+    t = np.clip(s - middle, 0., arc_len) / bend
+    after = np.maximum(s - middle - arc_len, 0.)
+
+    x = np.minimum(s, middle) + bend * np.sin(t)
+    y = bend * (1. - np.cos(t)) + after
+    return np.column_stack((x, y, np.zeros(len(s))))
+
+def base_radii(s, length):
+    return 1.6 + 0.2 * np.sin(s / 3.)
+
+# Straight tunnel narrowing to radius of 0.6 in the middle.
+def bottleneck_radii(s, length):
+    middle = length / 2.
+    return 1.8 - 1.2 * np.exp(-((s - middle) / 3.) ** 2)
+
+SHAPES = {
+    "straight"   : (straight_axis, base_radii),
+    "helix"      : (helix_axis, base_radii),
+    "sharp-turn" : (sharp_turn_axis, base_radii),
+    "bottleneck" : (straight_axis, bottleneck_radii),
+}
+
+# Return centers (n x 3) and radii (n) of synthetic tunnel of given shape.
+def generate_tunnel(shape, n, spacing=0.4):
+    axis, radii = SHAPES[shape]
+    length = spacing * (n - 1)
+
+    # Sample the axis densely and resample it by arc length.
+    dense_s = np.linspace(0., 1.5 * length, 10 * n)
+    points  = axis(dense_s, length)
+    arc     = np.concatenate(([0.], np.cumsum(
+        np.sqrt((np.diff(points, axis=0) ** 2).sum(axis=1)))))
+    s = np.arange(n) * spacing
+    centers = np.column_stack([np.interp(s, arc, points[:, k])
+                               for k in xrange(3)])
+    return centers, radii(s, length)
+
+def write_pdb(filename, centers, radii):
+    with open(filename, "w") as outfile:
+        for i, (c, r) in enumerate(zip(centers, radii)):
+            outfile.write("ATOM  {:5d}  H   FIL T   1    {:8.3f}{:8.3f}{:8.3f}"
+                          "{:6.2f}{:6.2f}\n".format(i + 1, c[0], c[1], c[2],
+                                                    r, r))
+
+
+if __name__ == '__main__':
+    from docopt import docopt
+
+    arguments = docopt(__doc__)
+    centers, radii = generate_tunnel(arguments["<shape>"],
+                                     int(arguments["<n>"]),
+                                     float(arguments["--spacing"]))
+    write_pdb(arguments["<out-filename>"], centers, radii)
@@ -7,11 +7,13 @@ Usage:
 
 Options:
   -h --help                         Show this help.
-  -f --file                         File containing information about the disks in dsd format.
+  -f --file                         File containing information about the disks in dsd or binary
+                                    format.
   --ct <ct>                         Center threshold, maximal distance between the centers of two disks in the set of representative disks
   --nt <nt>                         Normal threshold, maximal angle in degrees between the normals of two disks in the set of representative disks
   --rt <rt>                         Radius threshold, maximal difference between the radiuses of two disks in the set of representative disks
-  -o --output-file <out-filename>   Dump representative disks (not too far, not too close, capturing the abrupt changes) to file in dsd format.
+  -o --output-file <out-filename>   Dump representative disks (not too far, not too close, capturing the abrupt changes) to file in dsd format,
+                                    or in binary format if its extension is .npz.
 
 """
 
@@ -22,18 +24,13 @@ import visual as vs
 
 from docopt import docopt
 from digger import *
+from disk_format import read_disks, save_disks
 from visual import *
 
 def load_disks_from_file(filename):
-    disks = []
-    if filename:
-        with open(filename, "r") as input_file:
-            for line in input_file:
-                numbers = line.split()
-                disk = Disk(np.array([float(numbers[0]), float(numbers[1]), float(numbers[2])]), np.array([float(numbers[3]), float(numbers[4]), float(numbers[5])]), float(numbers[6]))
-                disks.append(disk)
-        input_file.close()
-    return disks
+    if not filename:
+        return []
+    return read_disks(filename).to_disks()
 
 
 def choose_representative_disks(disks):
@@ -67,10 +64,5 @@ if __name__ == '__main__':
 
     output_path = arguments.get("--output-file")
     if output_path:
-        with open(output_path, "w") as output_file:
-            for disk in disks:
-                line = "{} {} {} {} {} {} {}\n".format(disk.center[0],
-                    disk.center[1], disk.center[2], disk.normal[0], disk.normal[1],
-                    disk.normal[2], disk.radius)
-                output_file.write(line)
+        save_disks(disks, output_path)
 
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+
+"""Batch discretization of many tunnels.
+
+Usage:
+  dig_many.py <path>... [--pattern <glob>] [--delta <delta>] [--adaptive-step] [--optimizer <name>] [--cores <n>] [--output-dir <dir>] [--format <name>] [--manifest <file>] [--force] [--profile] [--no-cache | --cache-dir <dir>]
+
+Options:
+  -h --help                         Show this help.
+  <path>                            Tunnel PDB file, glob of them or directory searched
+                                    recursively for files matching --pattern.
+  --pattern <glob>                  Pattern of tunnel files in directories
+                                    [default: *tun_cl_*.pdb].
+  --delta <delta>                   Maximal distance between disks.
+  --adaptive-step                   Advance disks by the largest step predicted to keep
+                                    them closer than delta instead of delta / 10.
+  --optimizer <name>                Strategy searching for tunnel directions,
+                                    'scan' (default) or 'nelder-mead'.
+  --cores <n>                       Number of cores shared by all tunnels (all CPUs
+                                    by default).
+  --output-dir <dir>                Directory of dsd outputs, mirroring layout of input
+                                    directories. Outputs are placed next to inputs
+                                    by default.
+  --format <name>                   Format of outputs, 'dsd' or 'npz' (binary, see
+                                    disk_format.py) [default: dsd].
+  --manifest <file>                 Summary of the run in JSON [default: manifest.json].
+  --force                           Discretize also tunnels whose output is newer than
+                                    the input and was made with the same settings.
+  --profile                         Record call counts and wall time of pipeline stages
+                                    of every tunnel in the manifest.
+  --no-cache                        Do not cache computed tunnel directions.
+  --cache-dir <dir>                 Directory of tunnel directions cache
+                                    (~/.cache/tunnel-discretizer by default).
+
+"""
+
+import errno
+import fnmatch
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from multiprocessing import Pool, cpu_count
+
+import profiling
+from docopt import docopt, printable_usage
+from digger import *
+from disk_format import is_binary_path, make_header, save_disks
+from tunnel import get_min_circle_solver
+
+
+# Find tunnel files given by `paths` (files, globs or directories). Returns
+# list of pairs of tunnel file and its path relative to output directory.
+def find_tunnels(paths, pattern):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, __, names in os.walk(path):
+                for name in sorted(fnmatch.filter(names, pattern)):
+                    filename = os.path.join(root, name)
+                    found.append((filename, os.path.relpath(filename, path)))
+        else:
+            for filename in sorted(glob.glob(path)) or [path]:
+                found.append((filename, os.path.basename(filename)))
+    return found
+
+def get_output_path(filename, rel_path, output_dir, output_format="dsd"):
+    ext = "." + output_format
+    if output_dir is None:
+        return os.path.splitext(filename)[0] + ext
+    return os.path.join(output_dir, os.path.splitext(rel_path)[0] + ext)
+
+# Settings of digging which the outputs depend on, recorded in manifest.
+def get_settings(opts_args):
+    return {"delta"         : opts_args["delta"],
+            "optimizer"     : opts_args["optimizer"],
+            "adaptive_step" : opts_args["adaptive_step"],
+            "solver"        : get_min_circle_solver()}
+
+# Settings of outputs done by previous run given by its manifest, keyed by
+# output path. Empty if there is no readable manifest.
+def load_output_settings(manifest_path):
+    try:
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (IOError, ValueError):
+        return {}
+    return dict((record["output"], record["settings"])
+                for record in manifest.get("tunnels", [])
+                if "settings" in record)
+
+# Output is up to date if it is newer than the input and was made with the
+# same `settings` according to `output_settings` of previous run.
+def is_up_to_date(filename, output_path, settings, output_settings):
+    return os.path.exists(filename) and os.path.exists(output_path) \
+        and os.path.getmtime(output_path) >= os.path.getmtime(filename) \
+        and output_settings.get(output_path) == settings
+
+# Create directory and its parents, which may be created concurrently by
+# other workers.
+def make_dirs(directory):
+    if not directory:
+        return
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+def get_size(filename):
+    return os.path.getsize(filename) if os.path.exists(filename) else 0
+
+# Discretize single tunnel. Output of digging goes to log file next to the
+# output, so that logs of tunnels processed in parallel do not mix. Failures
+# are reported in returned record instead of being raised.
+def dig_file(task):
+    filename, output_path, opts, settings, profile = task
+    record = {"input" : filename, "output" : output_path,
+              "log" : output_path + ".log"}
+    start  = time.time()
+    profiling.enable(profile)
+    profiling.reset()
+    stdout = sys.stdout
+    try:
+        make_dirs(os.path.dirname(output_path))
+        with open(record["log"], "w") as log_file:
+            sys.stdout = log_file
+            try:
+                tunnel = Tunnel()
+                tunnel.load_from_file(filename)
+                disks = dig_tunnel(tunnel, opts)
+            finally:
+                sys.stdout = stdout
+        # Write output only when the whole tunnel is done, so that partial
+        # output is never considered up to date.
+        root, ext = os.path.splitext(output_path)
+        header = make_header(opts.delta, filename) \
+            if is_binary_path(output_path) else None
+        save_disks(disks, root + ".tmp" + ext, header)
+        os.rename(root + ".tmp" + ext, output_path)
+        record.update(status="done", spheres=len(tunnel.t), disks=len(disks),
+                      settings=settings)
+    except Exception as e:
+        __, line, function, __ = traceback.extract_tb(sys.exc_info()[2])[-1]
+        record.update(status="failed", reason="{}: {} (in {}, line {})"
+                      .format(type(e).__name__, e, function, line))
+    record["seconds"] = time.time() - start
+    if profile:
+        record["profile"] = profiling.take_stats()
+    return record
+
+# Discretize all `tunnels` (pairs of input and output path) using `n_cores`.
+# Tunnels are distributed over a single pool of processes, each of them
+# computing tunnel directions serially. Only a lone tunnel uses all cores for
+# its directions. Yields records of finished tunnels.
+def dig_all(tunnels, opts_args, n_cores, profile=False):
+    n_jobs    = min(n_cores, len(tunnels))
+    n_workers = n_cores if n_jobs <= 1 else 1
+    tasks     = [(f, out, DigOpts(filename=f, n_workers=n_workers, **opts_args),
+                  get_settings(opts_args), profile) for f, out in tunnels]
+    # Largest tunnels first, so that they do not delay the end of the run.
+    tasks.sort(key=lambda task: -get_size(task[0]))
+
+    if n_jobs <= 1:
+        for task in tasks:
+            yield dig_file(task)
+        return
+
+    pool = Pool(n_jobs)
+    try:
+        for record in pool.imap_unordered(dig_file, tasks):
+            yield record
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+if __name__ == '__main__':
+    arguments = docopt(__doc__)
+    n_cores = int(arguments["--cores"] or 0) or cpu_count()
+    if arguments["--format"] not in ("dsd", "npz"):
+        sys.exit("Unknown format '{}', use 'dsd' or 'npz'.\n{}".format(
+            arguments["--format"], printable_usage(__doc__)))
+    opts_args = {
+        "delta"         : float(arguments["--delta"] or 0.3),
+        "optimizer"     : arguments["--optimizer"] or "scan",
+        "use_cache"     : not arguments["--no-cache"],
+        "cache_dir"     : arguments["--cache-dir"],
+        "adaptive_step" : arguments["--adaptive-step"],
+    }
+
+    start    = time.time()
+    records  = []
+    pending  = []
+    settings = get_settings(opts_args)
+    output_settings = load_output_settings(arguments["--manifest"])
+    for filename, rel_path in find_tunnels(arguments["<path>"],
+                                           arguments["--pattern"]):
+        output_path = get_output_path(filename, rel_path,
+                                      arguments["--output-dir"],
+                                      arguments["--format"])
+        if not arguments["--force"] and is_up_to_date(filename, output_path,
+                settings, output_settings):
+            records.append({"input" : filename, "output" : output_path,
+                            "status" : "skipped", "settings" : settings})
+        else:
+            pending.append((filename, output_path))
+    print "{} tunnels to discretize, {} up to date.".format(len(pending),
+                                                            len(records))
+
+    for i, record in enumerate(dig_all(pending, opts_args, n_cores,
+                                            arguments["--profile"])):
+        print "[{}/{}] {} {} ({:.1f} s)".format(i + 1, len(pending),
+            record["input"], record["status"], record["seconds"])
+        if record["status"] == "failed":
+            print "    " + record["reason"]
+        records.append(record)
+
+    manifest = {
+        "delta"     : opts_args["delta"],
+        "optimizer" : opts_args["optimizer"],
+        "cores"     : n_cores,
+        "seconds"   : time.time() - start,
+        "tunnels"   : sorted(records, key=lambda record: record["input"]),
+    }
+    with open(arguments["--manifest"], "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+
+    failed = [r for r in records if r["status"] == "failed"]
+    print "Done, {} failed. Manifest written to {}.".format(len(failed),
+        arguments["--manifest"])
+    sys.exit(1 if failed else 0)
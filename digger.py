@@ -8,29 +8,59 @@ from tunnel import Tunnel
 from minimal_enclosing import make_circle
 from digger import *
 from tunnel_curve import TunnelCurve
+from orientation import ORIENTATION_OPTIMIZERS
+from profiling import record_count, timed
 
 
 class DigOpts:
-    def __init__(self, delta, filename):
+    def __init__(self, delta, filename, optimizer="scan", n_workers=None,
+                 use_cache=True, cache_dir=None, shift_max_iter=20,
+                 shift_tol=1e-6, adaptive_step=False):
         self.delta = delta
         self.eps   = delta * 0.1
         self.look_ahead = 2 * delta
         self.filename = filename
-
+        # Name of strategy from `ORIENTATION_OPTIMIZERS` used to compute
+        # tunnel directions.
+        if optimizer not in ORIENTATION_OPTIMIZERS:
+            raise ValueError("Unknown optimizer '{}', use one of {}.".format(
+                optimizer, ", ".join(sorted(ORIENTATION_OPTIMIZERS))))
+        self.optimizer = optimizer
+        # Number of processes computing tunnel directions, all CPUs if None.
+        self.n_workers = n_workers
+        # Whether tunnel directions are cached on disk and where, see
+        # `DirectionCache`.
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        # Bounds of iterations of `shift_new_disk`.
+        self.shift_max_iter = shift_max_iter
+        self.shift_tol      = shift_tol
+        # Whether disks advance by `eps` or by adaptive step, see
+        # `advance_adaptive`.
+        self.adaptive_step  = adaptive_step
+
+@timed("dig_tunnel")
 def dig_tunnel(tunnel, opts):
-    centers = [s.center for s in tunnel.t]
-    normals = [normalize(centers[i + 1] - centers[i]) \
-               for i in xrange(len(centers) - 1)]
     curve = TunnelCurve(tunnel, 6., opts)
-    disks = [
-        tunnel.fit_disk(curve.get_weighted_dir(0, 0), centers[0])
-    ]
-
+    return dig_along_curve(tunnel, curve, opts)
+
+# Dig disks along tunnel `curve` starting with segment between tunnel centers
+# `first_segment` and `first_segment + 1`. Digging continues from `disks` dug
+# so far, if given. State of digging at the start of every segment, number of
+# disks and the last disk, is appended to `checkpoints`, if given, so that
+# digging can be later resumed from any segment.
+def dig_along_curve(tunnel, curve, opts, disks=None, first_segment=0,
+                    checkpoints=None):
+    centers = [s.center for s in tunnel.t]
+    if disks is None:
+        disks = [
+            tunnel.fit_disk(curve.get_weighted_dir(0, 0), centers[0])
+        ]
 
     # Calculate disks position
-    for i, __ in enumerate(tunnel.t):
-        if i == len(tunnel.t) - 1:
-            break
+    for i in xrange(first_segment, len(tunnel.t) - 1):
+        if checkpoints is not None:
+            checkpoints.append((len(disks), disks[-1]))
 
         print("Processing ball NO. %d" % i)
         center       = centers[i]
@@ -57,6 +87,10 @@ def dig_tunnel(tunnel, opts):
                 new_normal  = disks[-1].normal
                 shift_fun   = shift_sharp_turn
                 # print "new disk distance: ", disk_dist(disks[-1], new_disk)
+            elif opts.adaptive_step:
+                disk_center, new_normal = advance_adaptive(tunnel, curve,
+                    disks[-1], i, size, centers_dist, opts)
+                shift_fun   = shift_new_disk
             else:
                 # print("Moving!")
                 disk_center = disks[-1].center + disks[-1].normal * opts.eps
@@ -75,9 +109,43 @@ def dig_tunnel(tunnel, opts):
             else:
                 disks.append(new_disk)
 
+    if len(disks) > 1:
+        print "Maximal distance of consecutive disks: {}".format(
+            DiskArray.from_disks(disks).consecutive_dists().max())
     return disks
 
 
+# Find center and normal of the next disk advanced along normal of `prev_disk`
+# as far as possible. `size` is distance of `prev_disk` from the beginning of
+# segment `segment_idx` of length `segment_len` increased by `opts.eps`.
+# Vertices of the new disk move away from vertices of `prev_disk` by the
+# advance and by tilt of the disk, so the largest advance keeping the disks
+# closer than `opts.delta` is predicted from radius of `prev_disk` and
+# curvature of `curve`. The advance is halved, down to `opts.eps`, while the
+# fitted disk is still too far.
+def advance_adaptive(tunnel, curve, prev_disk, segment_idx, size, segment_len,
+                     opts):
+    def get_normal(advance):
+        return curve.get_weighted_dir(segment_idx,
+            min(size - opts.eps + advance, segment_len))
+
+    max_advance = 0.9 * opts.delta
+    tilt    = math.radians(angle_norm_vectors(prev_disk.normal,
+                                              get_normal(max_advance)))
+    advance = max_advance - prev_disk.radius * tilt
+    advance = min(max(advance, opts.eps), max_advance)
+
+    while True:
+        disk_center = prev_disk.center + prev_disk.normal * advance
+        new_normal  = get_normal(advance)
+        if advance <= opts.eps:
+            return disk_center, new_normal
+        new_disk = tunnel.fit_disk(new_normal, disk_center)
+        if disk_dist(new_disk, prev_disk) < opts.delta \
+           and is_follower(prev_disk, new_disk):
+            return disk_center, new_normal
+        advance = max(advance / 2., opts.eps)
+
 def fit_disk_tunnel(normal, center, tunnel):
     disk_plane  = Plane(center, normal)
     circle_cuts = []
@@ -161,10 +229,9 @@ def find_max_distance(d1, d2):
     assert np.linalg.norm(d1.normal - d2.normal) < f_error
 
     v = normalize(d2.center - d1.center)
-    if (d1.normal == v).all():
-        v = null_space(np.array([d1.normal, null_vec, null_vec]))
-    return null_space(np.array([d1.normal, v, null_vec]))
+    return plane_normal(d1.normal, v)
 
+@timed("is_sharp_turn")
 def is_sharp_turn(tunnel, prev_disk, opts):
     disk_center = prev_disk.center + prev_disk.normal * opts.look_ahead
     new_disk = tunnel.fit_disk(prev_disk.normal, disk_center)
@@ -181,13 +248,83 @@ def is_sharp_turn(tunnel, prev_disk, opts):
     # print abs(d1 - d2) / d1
     return abs(d1 - d2) / ((d1 + d2) / 2.) > 0.35
 
+# Shift `new_disk` so that it follows `prev_disk` and is closer than
+# `opts.delta` to it. Every iteration pulls vertices of the new disk farther
+# than `scale * delta` from vertices of the previous disk to distance of
+# `0.95 * scale * delta` and refits the disk to the tunnel. Whenever the
+# refitted disk is still too far, the scale is halved. Iterations stop after
+# `opts.shift_max_iter` iterations or when the disk moves less than
+# `opts.shift_tol * delta` between them, the closest follower found being
+# used then. Until some follower is found, iterations go on while the
+# vertices are pulled by at least `opts.shift_tol * delta`, i.e. while the
+# scale is not below `opts.shift_tol`.
+@timed("shift_new_disk")
 def shift_new_disk(prev_disk, new_disk, tunnel, opts):
+    delta = opts.delta
+    scale = 1.
+    best_disk = None
+    best_dist = None
+
+    n_iter = 0
+    while True:
+        n_iter += 1
+        shifted = shift_new_disk_step(prev_disk, new_disk, tunnel, delta, scale)
+        dist    = disk_dist(shifted, prev_disk)
+        if is_follower(prev_disk, shifted) \
+           and (best_dist is None or dist < best_dist):
+            best_disk, best_dist = shifted, dist
+        if best_dist is not None and best_dist <= delta:
+            break
+        if best_disk is not None:
+            if n_iter >= opts.shift_max_iter:
+                print "Shifting of disk did not converge in {} iterations." \
+                    .format(n_iter)
+                break
+            if disk_dist(shifted, new_disk) < opts.shift_tol * delta:
+                break
+        elif scale < opts.shift_tol:
+            raise RuntimeError("No shifted disk follows previous disk in {} "
+                               "iterations.".format(n_iter))
+        new_disk = shifted
+        scale   /= 2.
+    record_count("shift_new_disk", "iterations", n_iter)
+
+    if best_dist > delta:
+        print "Shifted disk is farther than delta from previous disk " \
+            "({} > {}).".format(best_dist, delta)
+    new_disk = best_disk
+    assert is_follower(prev_disk, new_disk)
+
+    # Check whether our function does what it is supposed to do.
+    new_dir, prev_dir = get_radius_vectors(new_disk, prev_disk)
+
+    #     print abs(get_radius(new_disk.normal, new_disk.center, tunnel) - new_disk.radius)
+    new_vert_1 = new_disk.center + new_dir
+    new_vert_2 = new_disk.center - new_dir
+    # print "New vertex 1: '{}', New vertex 2: '{}'".format(new_vert_1, new_vert_2)
+
+    v1 = new_vert_1 - prev_disk.center
+    v2 = new_vert_2 - prev_disk.center
+
+    # print prev_disk.normal, v1
+    # print np.dot(prev_disk.normal, v1)
+
+    # print prev_disk.normal, v2
+    # print np.dot(prev_disk.normal, v2)
+
+    assert np.dot(prev_disk.normal, v1) > -f_error
+    assert np.dot(prev_disk.normal, v2) > -f_error
+    return new_disk
+
+# Single iteration of `shift_new_disk` with given `scale` of the shift.
+# Returns refitted disk.
+@timed("shift_new_disk_step")
+def shift_new_disk_step(prev_disk, new_disk, tunnel, delta, scale):
     # print "\n\n"
     # print "Previous Disk:"
     # print prev_disk.to_geogebra()
     # print "New Disk:"
     # print new_disk.to_geogebra()
-    delta = opts.delta
     new_vert_1, new_vert_2, prev_vert_1, prev_vert_2 \
         = get_vertices(new_disk, prev_disk)
 
@@ -233,10 +370,10 @@ def shift_new_disk(prev_disk, new_disk, tunnel, opts):
     # print "Before: ", np.linalg.norm(v1), np.linalg.norm(v2)
 
     # Ensure that disks are not too far from each other.
-    if d1 > delta:
-        new_vert_1 = prev_vert_1 + normalize(v1) * delta * 0.95
-    if d2 > delta:
-        new_vert_2 = prev_vert_2 + normalize(v2) * delta * 0.95
+    if d1 > delta * scale:
+        new_vert_1 = prev_vert_1 + normalize(v1) * delta * 0.95 * scale
+    if d2 > delta * scale:
+        new_vert_2 = prev_vert_2 + normalize(v2) * delta * 0.95 * scale
 
     # print "Disk distance: %f" % disk_dist(new_disk, prev_disk)
     new_disk = get_new_disk_points(new_vert_1, new_vert_2, prev_disk.normal)
@@ -246,33 +383,9 @@ def shift_new_disk(prev_disk, new_disk, tunnel, opts):
     new_disk = tunnel.fit_disk(new_disk.normal, new_disk.center)
     # print "Revised disk : {}".format(new_disk.to_geogebra())
     # print "Disk distance: %f > %f\n" % (disk_dist(new_disk, prev_disk), delta)
-
-    if disk_dist(new_disk, prev_disk) > delta or not is_follower(prev_disk, new_disk):
-        new_disk = shift_new_disk(prev_disk, new_disk, tunnel, opts)
-    assert is_follower(prev_disk, new_disk)
-
-    # Check whether our function does what it is supposed to do.
-    new_dir, prev_dir = get_radius_vectors(new_disk, prev_disk)
-
-    #     print abs(get_radius(new_disk.normal, new_disk.center, tunnel) - new_disk.radius)
-    new_vert_1 = new_disk.center + new_dir
-    new_vert_2 = new_disk.center - new_dir
-    # print "New vertex 1: '{}', New vertex 2: '{}'".format(new_vert_1, new_vert_2)
-
-    v1 = new_vert_1 - prev_disk.center
-    v2 = new_vert_2 - prev_disk.center
-
-    # print prev_disk.normal, v1
-    # print np.dot(prev_disk.normal, v1)
-
-    # print prev_disk.normal, v2
-    # print np.dot(prev_disk.normal, v2)
-
-    assert np.dot(prev_disk.normal, v1) > -f_error
-    assert np.dot(prev_disk.normal, v2) > -f_error
-    # assert disk_dist(prev_disk, new_disk) < delta
     return new_disk
 
+@timed("shift_sharp_turn")
 def shift_sharp_turn(prev_disk, new_disk, tunnel, opts):
     plane_normal = find_max_distance(prev_disk, new_disk)
     new_vert_1, new_vert_2, prev_vert_1, prev_vert_2 = \
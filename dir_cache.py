@@ -0,0 +1,86 @@
+import errno
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+# Bump whenever the way directions are computed changes, so that stale cache
+# entries are not used anymore. Settings affecting the directions are part of
+# the key as well, see `TunnelCurve`.
+CACHE_VERSION = 2
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") \
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "tunnel-discretizer")
+
+# On-disk cache of tunnel direction fields. Entries are `.npy` files named by
+# hash of sphere data and solver parameters, so the same tunnel is recognized
+# regardless of its file name. Total size of the cache is bounded by
+# `max_bytes`, least recently used entries being evicted first.
+class DirectionCache:
+
+    def __init__(self, directory=None, max_bytes=256 * 1024**2):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        # Concurrent runs may create the directory at the same time.
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    # Key identifying directions of given tunnel computed with solver
+    # parameters `params` (dictionary of simple values).
+    def get_key(self, tunnel, params):
+        digest = hashlib.sha1()
+        digest.update(str(CACHE_VERSION))
+        digest.update(np.ascontiguousarray(tunnel.centers, dtype=float).tostring())
+        digest.update(np.ascontiguousarray(tunnel.radii, dtype=float).tostring())
+        digest.update(repr(sorted(params.items())))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    # Return cached directions as array (M x 3) or None if not cached.
+    def load(self, key):
+        path = self._path(key)
+        try:
+            dirs = np.load(path)
+            # Loading counts as use for LRU eviction.
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return dirs
+
+    def store(self, key, dirs):
+        # Write to temporary file first, so that concurrent runs never see
+        # a partially written entry.
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        with os.fdopen(fd, "wb") as outfile:
+            np.save(outfile, np.array(dirs, dtype=float).reshape(-1, 3))
+        os.rename(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for __, size, __ in entries)
+        for __, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -3,41 +3,84 @@
 """Molecule tunnel discretization tool.
 
 Usage:
-  discretizer.py -f | --file <in-filename> [--delta <delta>] [-o <out-filename>]
+  discretizer.py -f | --file <in-filename> [--delta <delta>] [--adaptive-step] [--drop-contained] [--trajectory [--tolerance <tol>]] [--optimizer <name>] [--workers <n>] [--no-cache | --cache-dir <dir>] [--profile <json-file>] [-o <out-filename>]
 
 Options:
   -h --help                         Show this help.
   -f --file                         File containing information about tunnel in molecule in PDB format.
-  -o --output-file <out-filename>   Dump disks to file in dsd format.
+  -o --output-file <out-filename>   Dump disks to file in dsd format, or in binary format
+                                    if its extension is .npz (see disk_format.py).
   --delta <delta>                   Maximal distance between disks.
+  --adaptive-step                   Advance disks by the largest step predicted to keep
+                                    them closer than delta instead of delta / 10.
+  --drop-contained                  Remove spheres contained in other spheres instead
+                                    of rejecting the tunnel.
+  --trajectory                      Treat models of input file as frames of trajectory
+                                    and reuse work of the previous frame. Disks of
+                                    i-th frame are dumped to <out-filename>.i, or to
+                                    <name>.i.npz in binary format.
+  --tolerance <tol>                 Spheres moving less between frames are considered
+                                    unchanged [default: 0.001].
+  --optimizer <name>                Strategy searching for tunnel directions,
+                                    'scan' (default) or 'nelder-mead'.
+  --workers <n>                     Number of processes computing tunnel directions
+                                    (all CPUs by default).
+  --no-cache                        Do not cache computed tunnel directions.
+  --cache-dir <dir>                 Directory of tunnel directions cache
+                                    (~/.cache/tunnel-discretizer by default).
+  --profile <json-file>             Dump call counts and wall time of pipeline stages
+                                    to file in JSON.
 
 """
 
 import random
 import json
+import os
 import sys
 
+import profiling
 from docopt import docopt
 from digger import *
+from disk_format import is_binary_path, make_header, save_disks
+from tunnel import load_tunnels
+from trajectory import dig_trajectory
 
 
 if __name__ == '__main__':
     arguments = docopt(__doc__)
-    tunnel = Tunnel()
+    profiling.enable(bool(arguments["--profile"]))
     filename = arguments['<in-filename>']
-    tunnel.load_from_file(filename)
-    tunnel.t = tunnel.t[:]
+    drop_contained = arguments["--drop-contained"]
 
     delta = float(arguments["--delta"] or 0.3)
-    disks = []
-    disks = dig_tunnel(tunnel, DigOpts(delta, filename))
-
+    optimizer = arguments["--optimizer"] or "scan"
+    n_workers = int(arguments["--workers"] or 0) or None
+    opts = DigOpts(delta, filename, optimizer, n_workers,
+                   use_cache=not arguments["--no-cache"],
+                   cache_dir=arguments["--cache-dir"],
+                   adaptive_step=arguments["--adaptive-step"])
     output_path = arguments.get("--output-file")
-    if output_path:
-        with open(output_path, "w") as output_file:
-            for disk in disks:
-                line = "{} {} {} {} {} {} {}\n".format(disk.center[0],
-                    disk.center[1], disk.center[2], disk.normal[0], disk.normal[1],
-                    disk.normal[2], disk.radius)
-                output_file.write(line)
+    header = make_header(delta, filename) if output_path \
+        and is_binary_path(output_path) else None
+
+    if arguments["--trajectory"]:
+        tunnels = load_tunnels(filename, drop_contained)
+        tolerance = float(arguments["--tolerance"])
+        for frame, disks in enumerate(dig_trajectory(tunnels, opts, tolerance)):
+            if output_path:
+                root, ext = os.path.splitext(output_path)
+                frame_path = "{}.{}{}".format(root, frame, ext) \
+                    if is_binary_path(output_path) \
+                    else "{}.{}".format(output_path, frame)
+                save_disks(disks, frame_path, header)
+    else:
+        tunnel = Tunnel()
+        tunnel.load_from_file(filename, drop_contained)
+        tunnel.t = tunnel.t[:]
+        disks = dig_tunnel(tunnel, opts)
+
+        if output_path:
+            save_disks(disks, output_path, header)
 
+    if arguments["--profile"]:
+        profiling.dump(arguments["--profile"], filename=filename)
@@ -3,14 +3,28 @@
 """Molecule tunnel discretization tool.
 
 Usage:
-  discretizer.py -f | --file <in-filename> [-d] [--delta <delta>] [-o <out-filename>]
+  discretizer.py -f | --file <in-filename> [-d] [--delta <delta>] [--adaptive-step] [--drop-contained] [--optimizer <name>] [--workers <n>] [--no-cache | --cache-dir <dir>] [--profile <json-file>] [-o <out-filename>]
 
 Options:
   -h --help                         Show this help.
   -f --file                         File containing information about tunnel in molecule in PDB format.
   -d --draw                         Draw scenario into picture using vpython
-  -o --output-file <out-filename>   Dump disks to file in dsd format.
+  -o --output-file <out-filename>   Dump disks to file in dsd format, or in binary format
+                                    if its extension is .npz (see disk_format.py).
   --delta <delta>                   Maximal distance between disks.
+  --adaptive-step                   Advance disks by the largest step predicted to keep
+                                    them closer than delta instead of delta / 10.
+  --drop-contained                  Remove spheres contained in other spheres instead
+                                    of rejecting the tunnel.
+  --optimizer <name>                Strategy searching for tunnel directions,
+                                    'scan' (default) or 'nelder-mead'.
+  --workers <n>                     Number of processes computing tunnel directions
+                                    (all CPUs by default).
+  --no-cache                        Do not cache computed tunnel directions.
+  --cache-dir <dir>                 Directory of tunnel directions cache
+                                    (~/.cache/tunnel-discretizer by default).
+  --profile <json-file>             Dump call counts and wall time of pipeline stages
+                                    to file in JSON.
 
 """
 
@@ -19,22 +33,31 @@ import json
 import sys
 import visual as vs
 
+import profiling
 from docopt import docopt
 from digger import *
+from disk_format import is_binary_path, make_header, save_disks
 from visual import *
 
 
 if __name__ == '__main__':
     arguments = docopt(__doc__)
+    profiling.enable(bool(arguments["--profile"]))
     tunnel = Tunnel()
     filename = arguments['<in-filename>']
-    tunnel.load_from_file(filename)
+    tunnel.load_from_file(filename, arguments["--drop-contained"])
     tunnel.t = tunnel.t[:]
     draw_ARG = arguments["--draw"]
 
     delta = float(arguments["--delta"] or 0.3)
     disks = []
-    disks = dig_tunnel(tunnel, DigOpts(delta, filename))
+    optimizer = arguments["--optimizer"] or "scan"
+    n_workers = int(arguments["--workers"] or 0) or None
+    opts = DigOpts(delta, filename, optimizer, n_workers,
+                   use_cache=not arguments["--no-cache"],
+                   cache_dir=arguments["--cache-dir"],
+                   adaptive_step=arguments["--adaptive-step"])
+    disks = dig_tunnel(tunnel, opts)
 
     # draw disks
     if draw_ARG:
@@ -76,10 +99,10 @@ if __name__ == '__main__':
 
     output_path = arguments.get("--output-file")
     if output_path:
-        with open(output_path, "w") as output_file:
-            for disk in disks:
-                line = "{} {} {} {} {} {} {}\n".format(disk.center[0],
-                    disk.center[1], disk.center[2], disk.normal[0], disk.normal[1],
-                    disk.normal[2], disk.radius)
-                output_file.write(line)
+        header = make_header(delta, filename) \
+            if is_binary_path(output_path) else None
+        save_disks(disks, output_path, header)
+
+    if arguments["--profile"]:
+        profiling.dump(arguments["--profile"], filename=filename)
 
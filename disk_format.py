@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+"""Converter of discretized tunnels between dsd and binary format.
+
+Format of files is given by their extension, files ending with .npz are in
+binary format, all others in dsd.
+
+Usage:
+  disk_format.py <in-filename> <out-filename> [--delta <delta>] [--source <pdb-filename>]
+
+Options:
+  -h --help                         Show this help.
+  <in-filename>                     Disks in dsd or binary format.
+  <out-filename>                    Converted disks.
+  --delta <delta>                   Maximal distance between disks recorded in header
+                                    of binary output.
+  --source <pdb-filename>           Tunnel the disks come from, its name and hash are
+                                    recorded in header of binary output.
+
+"""
+
+import hashlib
+import json
+import os
+import struct
+import subprocess
+import zipfile
+import numpy as np
+
+from geometrical_objects import DiskArray
+
+# Disks are stored either in dsd format, text file with one disk per line
+# given by its center, normal and radius, or in binary format. Binary format
+# is uncompressed npz archive of arrays `centers` (N x 3), `normals` (N x 3)
+# and `radii` (N) of float64 and JSON `header` describing the disks. As the
+# archive is not compressed, the arrays are memory mapped when read, so that
+# reading many files costs only what is actually used. The archive is readable
+# by `np.load` as well.
+
+FORMAT_VERSION = 1
+BINARY_EXTENSION = ".npz"
+
+def is_binary_path(path):
+    return os.path.splitext(path)[1].lower() == BINARY_EXTENSION
+
+# Write `disks` (list of `Disk` or `DiskArray`) to file in dsd format, one
+# disk per line given by its center, normal and radius.
+def dump_disks(disks, output_path):
+    if isinstance(disks, DiskArray):
+        rows = zip(disks.centers, disks.normals, disks.radii)
+    else:
+        rows = [(disk.center, disk.normal, disk.radius) for disk in disks]
+    with open(output_path, "w") as output_file:
+        for center, normal, radius in rows:
+            line = "{} {} {} {} {} {} {}\n".format(center[0], center[1],
+                center[2], normal[0], normal[1], normal[2], radius)
+            output_file.write(line)
+
+# Read disks written by `dump_disks` as `DiskArray`.
+def load_disks(input_path):
+    data = np.loadtxt(input_path, ndmin=2).reshape(-1, 7)
+    return DiskArray(data[:, 0:3], data[:, 3:6], data[:, 6])
+
+# SHA-1 of file contents in hex.
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as infile:
+        for block in iter(lambda: infile.read(1 << 20), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+_revision = []
+
+# Git revision of the tool, None when not run from git checkout.
+def get_revision():
+    if not _revision:
+        try:
+            _revision.append(subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=open(os.devnull, "w")).strip())
+        except (OSError, subprocess.CalledProcessError):
+            _revision.append(None)
+    return _revision[0]
+
+# Header of binary file of disks with maximal distance `delta` discretizing
+# tunnel from file `source`.
+def make_header(delta=None, source=None):
+    return {"format_version" : FORMAT_VERSION,
+            "tool_version"   : get_revision(),
+            "delta"          : delta,
+            "source"         : os.path.basename(source) if source else None,
+            "source_sha1"    : file_sha1(source) if source else None}
+
+# Write `disks` (list of `Disk` or `DiskArray`) to file in binary format with
+# `header`, see `make_header`.
+def dump_disks_binary(disks, output_path, header=None):
+    if not isinstance(disks, DiskArray):
+        disks = DiskArray.from_disks(disks)
+    header = make_header() if header is None else header
+    # File object, so that `np.savez` does not append the extension.
+    with open(output_path, "wb") as output_file:
+        np.savez(output_file, centers=disks.centers, normals=disks.normals,
+                 radii=disks.radii, header=np.array(json.dumps(header)))
+
+# Memory map array `name` stored in uncompressed npz archive `path`.
+def _map_member(path, archive, name):
+    info = archive.getinfo(name + ".npy")
+    assert info.compress_type == zipfile.ZIP_STORED, \
+        "Compressed archive {} cannot be memory mapped".format(path)
+    with open(path, "rb") as infile:
+        # Data follow local file header of fixed size, name and extra field.
+        infile.seek(info.header_offset + 26)
+        name_len, extra_len = struct.unpack("<HH", infile.read(4))
+        infile.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(infile)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(infile)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(infile)
+        offset = infile.tell()
+    if np.prod(shape) == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                     order="F" if fortran_order else "C")
+
+# Read disks written by `dump_disks_binary`. Returns `DiskArray` of memory
+# mapped arrays and header.
+def load_disks_binary(input_path):
+    with np.load(input_path) as data:
+        header = json.loads(data["header"].item())
+    with zipfile.ZipFile(input_path) as archive:
+        disks = DiskArray(*[_map_member(input_path, archive, name)
+                            for name in ("centers", "normals", "radii")])
+    return disks, header
+
+# Write `disks` in format given by extension of `output_path`. Header is
+# recorded only in binary format.
+def save_disks(disks, output_path, header=None):
+    if is_binary_path(output_path):
+        dump_disks_binary(disks, output_path, header)
+    else:
+        dump_disks(disks, output_path)
+
+# Read disks in format given by extension of `input_path` as `DiskArray`.
+def read_disks(input_path):
+    if is_binary_path(input_path):
+        return load_disks_binary(input_path)[0]
+    return load_disks(input_path)
+
+
+if __name__ == '__main__':
+    from docopt import docopt
+
+    arguments = docopt(__doc__)
+    disks  = read_disks(arguments["<in-filename>"])
+    header = None
+    if is_binary_path(arguments["<out-filename>"]):
+        if is_binary_path(arguments["<in-filename>"]):
+            header = load_disks_binary(arguments["<in-filename>"])[1]
+        else:
+            header = make_header()
+        if arguments["--delta"]:
+            header["delta"] = float(arguments["--delta"])
+        if arguments["--source"]:
+            header.update(make_header(header["delta"], arguments["--source"]))
+    save_disks(disks, arguments["<out-filename>"], header)
+    print "{} disks written to {}.".format(len(disks),
+                                           arguments["<out-filename>"])
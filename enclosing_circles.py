@@ -0,0 +1,138 @@
+import math
+import numpy as np
+
+# Minimal circle enclosing given circles, in-tree replacement of
+# `minball.get_min_sphere2D`, working directly on arrays of centers (N x 2)
+# and radii (N).
+#
+# The solver keeps a small basis of circles and repeatedly adds the circle
+# violating the minimal circle of the basis the most, found by a single
+# vectorized pass over all circles. Minimal circle of the few basis circles
+# is found by Welzl's algorithm, the violating circle being moved to the
+# front. Radius grows with every step, so the solver terminates, usually in
+# a few steps. Basis of a similar problem, e.g. the previous fit, can be
+# given as `support` to warm start the solver.
+
+# Tolerance of enclosing test.
+EPS = 1e-9
+
+def _encloses(c, r, circle):
+    x, y, radius = circle
+    return math.hypot(x - c[0], y - c[1]) + radius <= r + EPS
+
+# Minimal circle enclosing two circles given as (x, y, r) triples.
+def _circle_2(circle1, circle2):
+    x1, y1, r1 = circle1
+    x2, y2, r2 = circle2
+    d = math.hypot(x2 - x1, y2 - y1)
+    if d + r2 <= r1:
+        return (x1, y1), r1
+    if d + r1 <= r2:
+        return (x2, y2), r2
+    r = (d + r1 + r2) / 2.
+    t = (r - r1) / d
+    return (x1 + (x2 - x1) * t, y1 + (y2 - y1) * t), r
+
+# Minimal circle enclosing three circles given as (x, y, r) triples, the
+# third one touching it.
+def _circle_3(circle1, circle2, circle3):
+    circles = [circle1, circle2, circle3]
+    x1, y1, r1 = circle1
+
+    # Circle (c, r) touching all three circles from outside satisfies
+    # |c - ci|^2 = (r - ri)^2. Subtracting the first equation from the others
+    # gives linear system for c depending on r, c = p + q * r, which is then
+    # substituted back to the first equation.
+    rows = [(2. * (x - x1), 2. * (y - y1),
+             x * x + y * y - r * r - (x1 * x1 + y1 * y1 - r1 * r1),
+             2. * (r - r1)) for x, y, r in circles[1:]]
+    (a11, a12, b1, e1), (a21, a22, b2, e2) = rows
+    det = a11 * a22 - a12 * a21
+    if abs(det) > 1e-12:
+        px = (b1 * a22 - b2 * a12) / det - x1
+        py = (a11 * b2 - a21 * b1) / det - y1
+        qx = (e1 * a22 - e2 * a12) / det
+        qy = (a11 * e2 - a21 * e1) / det
+
+        a = qx * qx + qy * qy - 1.
+        b = 2. * (px * qx + py * qy + r1)
+        c = px * px + py * py - r1 * r1
+        roots = []
+        if abs(a) < 1e-12:
+            if abs(b) > 1e-12:
+                roots = [-c / b]
+        else:
+            disc = b * b - 4. * a * c
+            if disc >= 0.:
+                sqrt_disc = math.sqrt(disc)
+                roots = [(-b - sqrt_disc) / (2. * a), (-b + sqrt_disc) / (2. * a)]
+        max_r = max(circle[2] for circle in circles)
+        for r in sorted(roots):
+            center = (x1 + px + qx * r, y1 + py + qy * r)
+            if r >= max_r - EPS \
+               and all(_encloses(center, r, circle) for circle in circles):
+                return center, r
+
+    # Degenerate configuration, one of the circles lies inside circle
+    # enclosing the other two.
+    candidates = [_circle_2(circle1, circle2), _circle_2(circle1, circle3),
+                  _circle_2(circle2, circle3)]
+    candidates = [(center, r) for center, r in candidates
+                  if all(_encloses(center, r, circle) for circle in circles)]
+    if candidates:
+        return min(candidates, key=lambda candidate: candidate[1])
+    center = (sum(c[0] for c in circles) / 3., sum(c[1] for c in circles) / 3.)
+    return center, max(math.hypot(x - center[0], y - center[1]) + r
+                       for x, y, r in circles)
+
+# Minimal circle enclosing few `circles` given as (x, y, r) triples by
+# Welzl's algorithm. Returns center, radius and positions of circles
+# touching it.
+def _solve_small(circles):
+    center, r = circles[0][:2], circles[0][2]
+    support = [0]
+    for i in xrange(1, len(circles)):
+        if _encloses(center, r, circles[i]):
+            continue
+        center, r = circles[i][:2], circles[i][2]
+        support = [i]
+        for j in xrange(i):
+            if _encloses(center, r, circles[j]):
+                continue
+            center, r = _circle_2(circles[i], circles[j])
+            support = [i, j]
+            for k in xrange(j):
+                if _encloses(center, r, circles[k]):
+                    continue
+                center, r = _circle_3(circles[i], circles[j], circles[k])
+                support = [i, j, k]
+    return center, r, support
+
+# Return center, radius and support (indices of circles defining the result)
+# of minimal circle enclosing circles given by `centers` (N x 2) and `radii`
+# (N). Circles given by indices in `support` form the initial basis.
+def min_enclosing_circle(centers, radii, support=()):
+    centers = np.asarray(centers, dtype=float)
+    radii   = np.asarray(radii, dtype=float)
+    assert len(radii) > 0
+    xs, ys = centers[:, 0], centers[:, 1]
+
+    basis = [int(i) for i in support if 0 <= i < len(radii)]
+    basis = sorted(set(basis), key=basis.index) or [int(np.argmax(radii))]
+    for __ in xrange(len(radii) + 1):
+        circles = [(xs[i], ys[i], radii[i]) for i in basis]
+        center, r, support = _solve_small(circles)
+        basis = [basis[i] for i in support]
+
+        excess = np.hypot(xs - center[0], ys - center[1]) + radii - r
+        violator = int(np.argmax(excess))
+        if excess[violator] <= EPS:
+            break
+        # Move to front, the violator is processed first by `_solve_small`.
+        basis = [violator] + basis
+    else:
+        # Numerical troubles, solve the whole problem at once.
+        circles = zip(xs, ys, radii)
+        center, r, support = _solve_small(circles)
+        basis = support
+    return np.array(center, dtype=float), float(r), np.array(basis, dtype=int)
@@ -1,13 +1,41 @@
 from linalg import *
 
-class Disk:
+# Geometrical objects are created in large numbers while searching for disks,
+# most of them being thrown away right after a single test. They therefore use
+# `__slots__` and compute all derived data lazily.
+class Disk(object):
+    __slots__ = ('_center', '_normal', 'radius', '_plane', '_perpen_vec')
 
     def __init__(self, center, normal, radius):
         self.center = center
         self.normal = normalize(normal)
         self.radius = radius
-        self._plane = Plane(center, normal)
-        self._perpen_vec = null_space(np.array([normal, null_vec, null_vec]))
+
+    # Setting center or normal invalidates lazily computed fields.
+    @property
+    def center(self):
+        return self._center
+
+    @center.setter
+    def center(self, center):
+        self._center = center
+        self._plane  = None
+
+    @property
+    def normal(self):
+        return self._normal
+
+    @normal.setter
+    def normal(self, normal):
+        self._normal     = normal
+        self._plane      = None
+        self._perpen_vec = None
+
+    @property
+    def perpen_vec(self):
+        if self._perpen_vec is None:
+            self._perpen_vec = orthogonal_vector(self.normal)
+        return self._perpen_vec
 
     def to_dict(self):
         packer  = lambda c : tuple([c[0], c[1], c[2]])
@@ -24,7 +52,9 @@ class Disk:
                 "radius" : self.radius}
     # Calculate plane that is determined by disk
     def get_plane(self):
-        return Plane(self.center, self.normal)
+        if self._plane is None:
+            self._plane = Plane(self.center, self.normal)
+        return self._plane
 
     def plot(self):
         vs.ring(pos=self.center,
@@ -45,16 +75,54 @@ class Disk:
         return abs(np.linalg.norm(vec) - self.radius) < f_error
 
     def get_point(self, alpha):
-        circle2D = Circle(self._plane.orthogonal_proj_param(self.center), self.radius)
+        plane    = self.get_plane()
+        circle2D = Circle(plane.orthogonal_proj_param(self.center), self.radius)
         full_angle = 2 * math.pi
         point = circle2D.get_point((alpha % full_angle) / full_angle)
-        return self._plane.get_point_for_param(point[0], point[1])
+        return plane.get_point_for_param(point[0], point[1])
 
     def intersection_segment(self, segment):
         return segment.intersection_disk(self)
 
+# Sequence of disks stored as arrays of centers (N x 3), normals (N x 3) and
+# radii (N), so that whole sequences can be processed at once.
+class DiskArray(object):
+    __slots__ = ('centers', 'normals', 'radii')
+
+    def __init__(self, centers, normals, radii):
+        self.centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+        self.normals = np.asarray(normals, dtype=float).reshape(-1, 3)
+        self.radii   = np.asarray(radii, dtype=float).reshape(-1)
+        assert len(self.centers) == len(self.normals) == len(self.radii)
+
+    @staticmethod
+    def from_disks(disks):
+        return DiskArray([d.center for d in disks], [d.normal for d in disks],
+                         [d.radius for d in disks])
+
+    def __len__(self):
+        return len(self.radii)
+
+    def __getitem__(self, i):
+        return Disk(self.centers[i].copy(), self.normals[i].copy(),
+                    float(self.radii[i]))
 
-class Plane:
+    def to_disks(self):
+        return [self[i] for i in xrange(len(self))]
+
+    # Distances (see `disk_dist`) of all pairs of consecutive disks.
+    def consecutive_dists(self):
+        return disk_dists(self.centers[:-1], self.normals[:-1], self.radii[:-1],
+                          self.centers[1:], self.normals[1:], self.radii[1:])
+
+    # Distances (see `disk_dist`) of all disks to `disk`.
+    def dists_to(self, disk):
+        return disk_dists(self.centers, self.normals, self.radii,
+                          disk.center, disk.normal, disk.radius)
+
+
+class Plane(object):
+    __slots__ = ('point', 'normal', '_basis', '_projector')
 
     def __init__(self, point, normal):
         self.point      = point
@@ -87,10 +155,23 @@ class Plane:
 
         return Circle(self.orthogonal_proj_param(cap_center), r)
 
+    # Calculate cuts of all spheres given by arrays of `centers` (N x 3) and
+    # `radii` (N) at once. Returns indices of spheres cut by plane together
+    # with parametric centers (K x 2) and radii (K) of the cut circles.
+    def intersection_spheres(self, centers, radii):
+        v1, v2 = self.get_base_vectors()
+        rel    = centers - self.point
+        dist   = np.dot(rel, self.normal)
+        idxs   = np.flatnonzero(np.abs(dist) < radii)
+
+        rel          = rel[idxs]
+        circ_centers = np.column_stack((np.dot(rel, v1), np.dot(rel, v2)))
+        circ_radii   = np.sqrt(radii[idxs] ** 2 - dist[idxs] ** 2)
+        return idxs, circ_centers, circ_radii
+
     def get_base_vectors(self):
         if self._basis is None:
-            v1 = normalize(null_space(np.array([self.normal, null_vec, null_vec])))
-            v2 = normalize(null_space(np.array([self.normal, v1, null_vec])))
+            v1, v2 = orthonormal_basis(self.normal)
             assert abs(np.dot(v1, v2)) < f_error
             assert abs(np.dot(v1, self.normal)) < f_error
             assert abs(np.dot(v2, self.normal)) < f_error
@@ -99,9 +180,10 @@ class Plane:
 
     def get_orthogonal_projector(self):
         if self._projector is None:
-            v1, v2      = self.get_base_vectors()
-            base_matrix = np.transpose(np.array([v1, v2]))
-            self._projector = np.linalg.pinv(base_matrix)
+            # Base vectors are orthonormal, so pseudo-inverse of the base
+            # matrix is just its transposition.
+            v1, v2 = self.get_base_vectors()
+            self._projector = np.array([v1, v2])
         return self._projector
 
     def orthogonal_projection(self, point):
@@ -120,7 +202,9 @@ class Plane:
         parameters = np.dot(projector, np.transpose(point - self.point))
         return parameters
 
-class Sphere:
+class Sphere(object):
+    __slots__ = ('center', 'radius')
+
     def __init__(self, center, radius):
         self.center = center
         self.radius = radius
@@ -219,7 +303,8 @@ class Segment:
         return abs(d1 + d2 - d3) < f_error
 
 
-class Circle:
+class Circle(object):
+    __slots__ = ('center', 'radius')
 
     def __init__(self, center, radius):
         self.center = center
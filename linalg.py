@@ -25,6 +25,48 @@ def null_space(A, eps=1e-15):
     null_space = np.compress(s <= eps, vh, axis=0)
     return null_space[0]
 
+# Cross product of two 3D vectors. Considerably cheaper than `np.cross` for
+# single vectors.
+def cross(u, v):
+    return np.array([u[1] * v[2] - u[2] * v[1],
+                     u[2] * v[0] - u[0] * v[2],
+                     u[0] * v[1] - u[1] * v[0]])
+
+# For unit vector `n` return unit vectors (b1, b2) such that (b1, b2, n) is a
+# right-handed orthonormal basis. Uses branch-free construction from Duff et
+# al., "Building an Orthonormal Basis, Revisited", which stays stable for all
+# directions of `n` without choosing a helper axis explicitly.
+def orthonormal_basis(n):
+    x, y, z = float(n[0]), float(n[1]), float(n[2])
+    sign = math.copysign(1., z)
+    a = -1. / (sign + z)
+    b = x * y * a
+    return (np.array([1. + sign * x * x * a, sign * b, -sign * x]),
+            np.array([b, sign + y * y * a, -y]))
+
+# Vectorized `orthonormal_basis` for unit vectors given as rows of `normals`.
+# Returns two arrays of the same shape.
+def orthonormal_bases(normals):
+    x, y, z = normals[:, 0], normals[:, 1], normals[:, 2]
+    sign = np.copysign(1., z)
+    a = -1. / (sign + z)
+    b = x * y * a
+    return (np.column_stack((1. + sign * x * x * a, sign * b, -sign * x)),
+            np.column_stack((b, sign + y * y * a, -y)))
+
+# Return unit vector perpendicular to unit vector `n`.
+def orthogonal_vector(n):
+    return orthonormal_basis(n)[0]
+
+# Return unit normal of plane spanned by vectors `u` and `v`. If the vectors
+# are parallel, any unit vector perpendicular to `u` is returned.
+def plane_normal(u, v):
+    w    = cross(u, v)
+    norm = math.sqrt(np.dot(w, w))
+    if norm < f_error:
+        return orthogonal_vector(normalize(u))
+    return w / norm
+
 def is_3D_basis(v1, v2, v3):
     return abs(np.linalg.det([v1, v2, v3])) > f_error
 
@@ -59,11 +101,11 @@ def get_radius_vectors(d1, d2, normal = None):
         assert abs(np.dot(normal, d1.normal)) < f_error
         assert abs(np.dot(normal, d2.normal)) < f_error
     else:
-        normal = null_space(np.array([d1.normal, d2.normal, null_vec]))
+        normal = plane_normal(d1.normal, d2.normal)
     # print "Normal:\n{}".format(normal)
     # Calculate directions of segments created by projection to the plan.
-    seg_dir1 = null_space(np.array([d1.normal, normal, null_vec]))
-    seg_dir2 = null_space(np.array([d2.normal, normal, null_vec]))
+    seg_dir1 = cross(d1.normal, normal)
+    seg_dir2 = cross(d2.normal, normal)
     # Get radius vector
     seg_dir1 = normalize(seg_dir1) * d1.radius
     seg_dir2 = normalize(seg_dir2) * d2.radius
@@ -97,39 +139,68 @@ def get_intersection_line_sphere(sphere, line):
 def disk_dist(d1, d2, normal = None):
     if (d1.normal == d2.normal).all() and normal is None :
         return np.linalg.norm(d1.center - d2.center)
+
+    # get radius vectors
+    seg_dir1, seg_dir2 = get_radius_vectors(d1, d2, normal = normal)
+    vert_1a, vert_1b = d1.center + seg_dir1, d1.center - seg_dir1
+    vert_2a, vert_2b = d2.center + seg_dir2, d2.center - seg_dir2
+
+    # Vertices of the segments are paired so that the pairs are closer.
+    dists_1 = (vec_norm(vert_1a - vert_2a), vec_norm(vert_1b - vert_2b))
+    dists_2 = (vec_norm(vert_1b - vert_2a), vec_norm(vert_1a - vert_2b))
+    if sum(dists_1) < sum(dists_2):
+        return max(dists_1)
     else:
-        # get radius vectors
-        seg_dir1, seg_dir2 = get_radius_vectors(d1, d2, normal = normal)
-
-        # for two sets of points calculate distances between pairs
-        def distances(v_1, v_2):
-            return [np.linalg.norm(x[0] - x[1]) for x in zip(v_1, v_2)]
-
-        seg_1_verts = [d1.center + seg_dir1, d1.center - seg_dir1]
-        seg_2_verts = [d2.center + seg_dir2, d2.center - seg_dir2]
-
-        dists_1 = distances(seg_1_verts, seg_2_verts)
-        dists_2 = distances(list(reversed(seg_1_verts)), seg_2_verts)
-        # print(dists_1, dists_2)
-
-        if sum(dists_1) < sum(dists_2):
-            return max(dists_1)
-        else:
-            return max(dists_2)
-
-        # Calculate transformation matrix from standard basis to
-        # (d1.normal, d2.normal, normal).
-        print "Transformation matrix from beta to standard:\n{}".format(
-            np.array([d1.normal, d2.normal, normal]))
-        A     = np.array([d1.normal, d2.normal, normal])
-        A_inv = np.linalg.inv(np.array([d1.normal, d2.normal, normal]))
-        # print dot(d1.normal, A_inv)
-        # print dot(d2.normal, A_inv)
-        # print dot(normal, A_inv)
-        # Because 'normal' vector is perpendicular to disk normals, the third
-        # coordinate of segment directions will be always zero in this basis.
-        seg_dir1_proj = dot(seg_dir1, A_inv)
-        seg_dir2_proj = dot(seg_dir2, A_inv)
+        return max(dists_2)
+
+# Norm of a single vector, cheaper than `np.linalg.norm`, with the same result.
+def vec_norm(v):
+    return math.sqrt(np.dot(v, v))
+
+# Norms of rows of `vs`.
+def row_norms(vs):
+    return np.sqrt((vs * vs).sum(axis=-1))
+
+# Vectorized `get_radius_vectors` for disks given by rows of normals and
+# radii. The first and the second disks are broadcast against each other, so
+# one disk can be given against many. Returns two arrays of shape N x 3.
+def get_radius_vectors_array(normals1, radii1, normals2, radii2):
+    normals1, normals2 = np.broadcast_arrays(np.atleast_2d(normals1),
+                                             np.atleast_2d(normals2))
+    normals = np.cross(normals1, normals2)
+    norms   = row_norms(normals)
+    # Parallel normals, any vector perpendicular to them will do.
+    parallel = norms < f_error
+    normals /= np.where(parallel, 1., norms)[:, np.newaxis]
+    if parallel.any():
+        units = normals1[parallel] / row_norms(normals1[parallel])[:, np.newaxis]
+        normals[parallel] = orthonormal_bases(units)[0]
+
+    seg_dirs1 = np.cross(normals1, normals)
+    seg_dirs2 = np.cross(normals2, normals)
+    seg_dirs1 *= (radii1 / row_norms(seg_dirs1))[:, np.newaxis]
+    seg_dirs2 *= (radii2 / row_norms(seg_dirs2))[:, np.newaxis]
+    return seg_dirs1, seg_dirs2
+
+# Vectorized `disk_dist` of disks given by rows of centers, normals and
+# radii, broadcast as in `get_radius_vectors_array`. Returns array of N
+# distances.
+def disk_dists(centers1, normals1, radii1, centers2, normals2, radii2):
+    seg_dirs1, seg_dirs2 = get_radius_vectors_array(normals1, radii1,
+                                                    normals2, radii2)
+    verts_1a, verts_1b = centers1 + seg_dirs1, centers1 - seg_dirs1
+    verts_2a, verts_2b = centers2 + seg_dirs2, centers2 - seg_dirs2
+
+    dists_1 = np.column_stack((row_norms(verts_1a - verts_2a),
+                               row_norms(verts_1b - verts_2b)))
+    dists_2 = np.column_stack((row_norms(verts_1b - verts_2a),
+                               row_norms(verts_1a - verts_2b)))
+    dists = np.where(dists_1.sum(axis=1) < dists_2.sum(axis=1),
+                     dists_1.max(axis=1), dists_2.max(axis=1))
+
+    same_normal = (np.atleast_2d(normals1) == np.atleast_2d(normals2)).all(axis=-1)
+    return np.where(same_normal, row_norms(np.atleast_2d(centers1 - centers2)),
+                    dists)
 
 def rotation_matrix(axis, theta):
     """
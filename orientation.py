@@ -0,0 +1,83 @@
+import math
+import numpy as np
+from scipy import optimize
+from linalg import *
+
+# Strategies searching for orientation of the minimal disk passed through by
+# tunnel curve in given point. Every strategy is called as
+# `strategy(tunnel, point, init_normal, curve)` and returns the best disk found,
+# oriented the same way as `init_normal`.
+
+# Original search scanning rings of rotated normals around the best normal
+# found so far, refining ring radius in 5 rounds. Search starts from
+# `start_disk` if given, disk of `init_normal` otherwise.
+def scan_search(tunnel, point, init_normal, curve, start_disk=None):
+    def get_rotated_normal(base_normal, theta, phi, axes):
+        axis1, axis2 = axes
+        v = np.dot(rotation_matrix(axis1, theta), base_normal)
+        v = np.dot(rotation_matrix(axis2, phi), v)
+        return normalize(v)
+
+    best_disk = start_disk if start_disk is not None \
+        else tunnel.fit_disk(init_normal, point)
+    for i in xrange(5):
+        theta = (math.pi / 3) / 4**i
+        # print("Round %d" % i)
+        found_better = True
+        while found_better:
+            found_better = False
+            base_normal  = best_disk.normal
+            axes         = orthonormal_basis(base_normal)
+
+            # Candidates of the whole ring depend only on `base_normal`,
+            # so they can be evaluated in a single batch.
+            normals = [get_rotated_normal(base_normal, theta, phi, axes)
+                       for phi in np.arange(0, 2*math.pi, 0.1 * (i + 1))]
+            disks, radii, passes = tunnel.evaluate_normals(normals, point, curve)
+            for disk, radius, passed in zip(disks, radii, passes):
+                if passed and radius < best_disk.radius:
+                    best_disk = disk
+                    best_disk.normal *= np.sign(np.dot(best_disk.normal, init_normal))
+                    found_better = True
+                    # print "Found better!", best_disk.radius
+    return best_disk
+
+# Nelder-Mead search over tangent plane of `init_normal`. Normal is
+# parametrized as normalize(init_normal + a * e1 + b * e2), which has no
+# singularities in the half-space of `init_normal` and keeps the orientation
+# of resulting disk. Disks not passed through by curve are rejected by
+# infinite objective value. Falls back to `scan_search` started from the best
+# disk found when the simplex does not converge.
+def nelder_mead_search(tunnel, point, init_normal, curve):
+    init_normal = normalize(init_normal)
+    e1, e2      = orthonormal_basis(init_normal)
+    init_disk   = tunnel.fit_disk(init_normal, point)
+    best        = [init_disk]
+
+    def get_normal(x):
+        return normalize(init_normal + x[0] * e1 + x[1] * e2)
+
+    def objective(x):
+        disk = tunnel.fit_disk(get_normal(x), point)
+        if not curve.pass_through_disk(disk):
+            return np.inf
+        if disk.radius < best[0].radius:
+            best[0] = disk
+        return disk.radius
+
+    # Initial simplex spans rotations by 30 degrees, which corresponds to the
+    # first ring of `scan_search`.
+    step    = math.tan(math.pi / 6)
+    simplex = np.array([[0., 0.], [step, 0.], [0., step]])
+    result  = optimize.minimize(objective, np.zeros(2), method='Nelder-Mead',
+                                options={'initial_simplex': simplex,
+                                         'xatol': 1e-3, 'fatol': 1e-6,
+                                         'maxfev': 200})
+    if not result.success:
+        return scan_search(tunnel, point, init_normal, curve, best[0])
+    return best[0]
+
+ORIENTATION_OPTIMIZERS = {
+    "scan"        : scan_search,
+    "nelder-mead" : nelder_mead_search,
+}
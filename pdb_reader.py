@@ -0,0 +1,64 @@
+import gzip
+import numpy as np
+
+# Fixed columns of ATOM records holding sphere data (0-based, end exclusive).
+# Radius of sphere is stored in occupancy column, or in B-factor column when
+# occupancy is blank, as written e.g. by CAVER.
+LINE_WIDTH     = 66
+COORD_COLUMNS  = [(30, 38), (38, 46), (46, 54)]
+RADIUS_COLUMN  = (54, 60)
+BFACTOR_COLUMN = (60, 66)
+
+# Open PDB file, possibly gzip compressed.
+def open_pdb(filename):
+    with open(filename, "rb") as infile:
+        magic = infile.read(2)
+    if magic == "\x1f\x8b":
+        return gzip.open(filename, "rb")
+    return open(filename, "rb")
+
+# Parse ATOM records given by `lines` into sphere centers (N x 3) and radii
+# (N). Lines are laid out into a single character matrix, so that every
+# column is converted to floats at once.
+def parse_atoms(lines):
+    if not lines:
+        return np.zeros((0, 3)), np.zeros(0)
+    data  = "".join(line[:LINE_WIDTH].ljust(LINE_WIDTH) for line in lines)
+    chars = np.frombuffer(data, dtype="S1").reshape(len(lines), LINE_WIDTH)
+
+    def get_field(columns):
+        first, last = columns
+        field = np.ascontiguousarray(chars[:, first:last])
+        return field.view("S{}".format(last - first)).ravel()
+
+    centers = np.column_stack([get_field(c).astype(float)
+                               for c in COORD_COLUMNS])
+    radii   = get_field(RADIUS_COLUMN)
+    blank   = np.char.strip(radii) == ""
+    radii   = np.where(blank, get_field(BFACTOR_COLUMN), radii).astype(float)
+    return centers, radii
+
+# Stream tunnels from PDB file one by one. Every MODEL ... ENDMDL block is
+# a separate tunnel, file without MODEL records holds single tunnel. Yields
+# pairs of sphere centers (N x 3) and radii (N).
+def iter_tunnels(filename):
+    infile = open_pdb(filename)
+    try:
+        atoms = []
+        for line in infile:
+            record = line[:6]
+            if record.startswith("ATOM"):
+                atoms.append(line.rstrip("\r\n"))
+            elif record.startswith("ENDMDL"):
+                yield parse_atoms(atoms)
+                atoms = []
+        if atoms:
+            yield parse_atoms(atoms)
+    finally:
+        infile.close()
+
+# Read the first tunnel of PDB file.
+def read_tunnel(filename):
+    for centers, radii in iter_tunnels(filename):
+        return centers, radii
+    return parse_atoms([])
@@ -0,0 +1,91 @@
+import json
+import time
+from functools import wraps
+
+# Opt-in instrumentation of the digging pipeline. When enabled, every
+# instrumented stage accumulates number of calls, wall time and maximal depth
+# of recursion. Time of recursive calls is counted only once, in the
+# outermost call. Stages may record other counts as well, e.g. number of
+# iterations, see `record_count`. When disabled, instrumented functions only
+# check a flag.
+
+_enabled = False
+# Stage name -> {"calls", "seconds", "max_depth"} and recorded counts.
+_stats   = {}
+# Stage name -> depth of currently running calls.
+_depths  = {}
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    _stats.clear()
+    _depths.clear()
+
+def _get_entry(name):
+    if name not in _stats:
+        _stats[name] = {"calls" : 0, "seconds" : 0., "max_depth" : 0}
+    return _stats[name]
+
+# Decorator instrumenting function as stage `name`.
+def timed(name):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+
+            entry = _get_entry(name)
+            depth = _depths.get(name, 0) + 1
+            entry["calls"] += 1
+            entry["max_depth"] = max(entry["max_depth"], depth)
+            _depths[name] = depth
+            start = time.time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _depths[name] = depth - 1
+                if depth == 1:
+                    entry["seconds"] += time.time() - start
+        return wrapper
+    return decorator
+
+# Add `value` of count `key`, e.g. number of iterations, of the current call
+# of stage `name`. Total and maximum per call, under "max_" + key, are kept.
+def record_count(name, key, value):
+    if not _enabled:
+        return
+    entry = _get_entry(name)
+    entry[key] = entry.get(key, 0) + value
+    entry["max_" + key] = max(entry.get("max_" + key, 0), value)
+
+# Copy of statistics collected so far.
+def get_stats():
+    return dict((name, dict(entry)) for name, entry in _stats.iteritems())
+
+# Return statistics collected so far and start collecting anew. Used by
+# worker processes to pass their statistics to the parent.
+def take_stats():
+    stats = get_stats()
+    reset()
+    return stats
+
+# Add statistics collected elsewhere, e.g. in worker process.
+def merge(stats):
+    for name, other in stats.iteritems():
+        entry = _get_entry(name)
+        for key, value in other.iteritems():
+            if key.startswith("max_"):
+                entry[key] = max(entry.get(key, 0), value)
+            else:
+                entry[key] = entry.get(key, 0) + value
+
+def dump(path, **info):
+    report = dict(info)
+    report["stages"] = get_stats()
+    with open(path, "w") as outfile:
+        json.dump(report, outfile, indent=2, sort_keys=True)
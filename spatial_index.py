@@ -0,0 +1,158 @@
+import itertools
+import math
+import numpy as np
+from collections import defaultdict
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from linalg import f_error
+
+# Uniform grid over bounding boxes of tunnel spheres. Every sphere is
+# registered in all cells its bounding box overlaps, so point and ball queries
+# only visit spheres stored in the few cells around the query instead of
+# scanning the whole tunnel.
+class SphereGrid:
+
+    def __init__(self, spheres, cell_size=None):
+        centers = np.array([s.center for s in spheres], dtype=float)
+        radii   = np.array([s.radius for s in spheres], dtype=float)
+        centers = centers.reshape(len(spheres), 3)
+
+        if cell_size is None:
+            # Cell roughly the size of an average sphere keeps the number of
+            # cells per sphere as well as spheres per cell small.
+            cell_size = 2 * radii.mean() if len(radii) > 0 else 1.
+        self.cell_size = float(cell_size)
+        self.origin    = np.zeros(3)
+        if len(radii) > 0:
+            self.origin = (centers - radii[:, np.newaxis]).min(axis=0)
+        self.cells = defaultdict(list)
+
+        # Pad boxes by `f_error` so that tolerant containment tests near sphere
+        # surface still find the sphere.
+        pad = radii[:, np.newaxis] + f_error
+        lo  = self._cell_coords(centers - pad)
+        hi  = self._cell_coords(centers + pad)
+        for idx in xrange(len(spheres)):
+            for key in self._cell_range(lo[idx], hi[idx]):
+                self.cells[key].append(idx)
+
+    def _cell_coords(self, points):
+        return np.floor((points - self.origin) / self.cell_size).astype(int)
+
+    def _cell_range(self, lo, hi):
+        ranges = [xrange(lo[k], hi[k] + 1) for k in xrange(3)]
+        return itertools.product(*ranges)
+
+    # Return indices of spheres whose bounding box may contain given point.
+    def query_point(self, point):
+        key = tuple(int(k) for k in self._cell_coords(point))
+        return self.cells.get(key, [])
+
+    # Return sorted indices of spheres whose bounding box may intersect
+    # bounding box of ball given by `center` and `radius`.
+    def query_ball(self, center, radius):
+        lo = self._cell_coords(center - radius - f_error)
+        hi = self._cell_coords(center + radius + f_error)
+        found = set()
+        for key in self._cell_range(lo, hi):
+            found.update(self.cells.get(key, ()))
+        return sorted(found)
+
+
+# Find all pairs of overlapping circles or balls given by `centers` (K x 2 or
+# K x 3) and `radii` (K) using sort and sweep along the axis of largest extent.
+# Returns two arrays of indices.
+def overlapping_pairs(centers, radii):
+    axis = 0
+    if len(radii) > 0:
+        axis = np.argmax(centers.max(axis=0) - centers.min(axis=0))
+    order = np.argsort(centers[:, axis] - radii)
+    lo    = (centers[:, axis] - radii)[order]
+    hi    = (centers[:, axis] + radii)[order]
+
+    # In sweep order, i-th circle can only overlap circles i + 1, ..., end - 1,
+    # where `end` is the first circle starting behind the end of i-th circle.
+    starts = np.arange(1, len(order) + 1)
+    ends   = np.searchsorted(lo, hi, side='right')
+    counts = np.maximum(ends - starts, 0)
+    offset = np.arange(counts.sum()) \
+        - np.repeat(np.cumsum(counts) - counts, counts)
+    first  = order[np.repeat(starts - 1, counts)]
+    second = order[np.repeat(starts, counts) + offset]
+
+    diff    = centers[first] - centers[second]
+    overlap = np.sqrt((diff ** 2).sum(axis=1)) <= radii[first] + radii[second]
+    return first[overlap], second[overlap]
+
+# Return sorted indices of all circles connected through overlapping circles to
+# at least one of circles given by `seeds` indices.
+def connected_circles(centers, radii, seeds):
+    if len(seeds) == 0:
+        return np.array([], dtype=int)
+    n_circles     = len(radii)
+    first, second = overlapping_pairs(centers, radii)
+    graph = coo_matrix((np.ones(len(first)), (first, second)),
+                       shape=(n_circles, n_circles))
+    __, labels = connected_components(graph, directed=False)
+    return np.flatnonzero(np.in1d(labels, labels[seeds]))
+
+# Bounding-volume hierarchy over consecutive segments of a polyline given by
+# `points` (S + 1 x 3). Leaves bound blocks of `leaf_size` consecutive
+# segments, inner nodes bound their two children. Nodes are stored as an
+# implicit complete binary tree (root 1, children of k are 2k and 2k + 1), so
+# queries of many balls at once are evaluated level by level with array
+# arithmetic.
+class SegmentBVH:
+
+    def __init__(self, points, leaf_size=16):
+        self.n_segments = max(len(points) - 1, 0)
+        self.leaf_size  = leaf_size
+        n_leaves = max(int(math.ceil(self.n_segments / float(leaf_size))), 1)
+        self.depth    = int(math.ceil(math.log(n_leaves, 2)))
+        self.n_leaves = 2 ** self.depth
+
+        # Empty boxes never intersect anything.
+        self.lo = np.full((2 * self.n_leaves, 3), np.inf)
+        self.hi = np.full((2 * self.n_leaves, 3), -np.inf)
+        for leaf in xrange(n_leaves):
+            start = leaf * leaf_size
+            end   = min(start + leaf_size, self.n_segments)
+            if start >= end:
+                continue
+            block = points[start:end + 1]
+            self.lo[self.n_leaves + leaf] = block.min(axis=0) - f_error
+            self.hi[self.n_leaves + leaf] = block.max(axis=0) + f_error
+        for node in xrange(self.n_leaves - 1, 0, -1):
+            self.lo[node] = np.minimum(self.lo[2 * node], self.lo[2 * node + 1])
+            self.hi[node] = np.maximum(self.hi[2 * node], self.hi[2 * node + 1])
+
+    # For balls given by `centers` (K x 3) and `radii` (K) return pairs of
+    # (ball index, segment index) such that bounding box of the segment
+    # intersects the ball. Pairs are sorted by ball and segment index.
+    def query_balls(self, centers, radii):
+        # Upper levels of the tree are small, start with all nodes of a level
+        # having at most 64 nodes.
+        start     = min(self.depth, 6)
+        n_nodes   = 2 ** start
+        ball_idxs = np.repeat(np.arange(len(radii)), n_nodes)
+        nodes     = np.zeros((len(radii), 1), dtype=int) \
+            + np.arange(n_nodes, 2 * n_nodes)
+        nodes     = nodes.ravel()
+        for level in xrange(start, self.depth + 1):
+            c     = centers[ball_idxs]
+            dist  = np.maximum(np.maximum(self.lo[nodes] - c, c - self.hi[nodes]), 0.)
+            close = (dist ** 2).sum(axis=1) <= radii[ball_idxs] ** 2
+            ball_idxs, nodes = ball_idxs[close], nodes[close]
+            if level < self.depth:
+                ball_idxs = np.repeat(ball_idxs, 2)
+                nodes     = np.repeat(2 * nodes, 2)
+                nodes[1::2] += 1
+
+        # Expand leaves to their segments.
+        offsets   = np.arange(self.leaf_size)
+        ball_idxs = np.repeat(ball_idxs, self.leaf_size)
+        seg_idxs  = ((nodes - self.n_leaves) * self.leaf_size)[:, np.newaxis] \
+            + offsets
+        seg_idxs  = seg_idxs.ravel()
+        valid     = seg_idxs < self.n_segments
+        return ball_idxs[valid], seg_idxs[valid]
@@ -0,0 +1,89 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from digger import DigOpts
+from dig_many import *
+
+class TestDigMany(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings  = get_settings({"delta" : 0.3, "optimizer" : "scan",
+                                       "adaptive_step" : False})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def touch(self, *names):
+        path = os.path.join(self.directory, *names)
+        make_dirs(os.path.dirname(path))
+        open(path, "w").close()
+        return path
+
+    def test_find_tunnels(self):
+        first  = self.touch("a", "tun_cl_1.pdb")
+        second = self.touch("a", "b", "tun_cl_2.pdb")
+        self.touch("a", "other.pdb")
+        self.assertEqual(find_tunnels([self.directory], "*tun_cl_*.pdb"),
+            [(first, os.path.join("a", "tun_cl_1.pdb")),
+             (second, os.path.join("a", "b", "tun_cl_2.pdb"))])
+
+        pattern = os.path.join(self.directory, "a", "*.pdb")
+        self.assertEqual(find_tunnels([pattern], None),
+            [(os.path.join(self.directory, "a", "other.pdb"), "other.pdb"),
+             (first, "tun_cl_1.pdb")])
+        # Paths matching nothing are kept, to be reported as failed.
+        self.assertEqual(find_tunnels(["missing.pdb"], None),
+                         [("missing.pdb", "missing.pdb")])
+
+    def test_output_path(self):
+        self.assertEqual(get_output_path("in/a/t.pdb", "a/t.pdb", None),
+                         "in/a/t.dsd")
+        self.assertEqual(get_output_path("in/a/t.pdb", "a/t.pdb", "out", "npz"),
+                         os.path.join("out", "a", "t.npz"))
+
+    def test_up_to_date(self):
+        filename = self.touch("t.pdb")
+        output   = os.path.join(self.directory, "t.dsd")
+        done     = {output : self.settings}
+        self.assertFalse(is_up_to_date(filename, output, self.settings, done))
+
+        self.touch("t.dsd")
+        now = time.time()
+        os.utime(filename, (now - 10, now - 10))
+        self.assertTrue(is_up_to_date(filename, output, self.settings, done))
+        # Output made by previous run with other settings or unknown ones.
+        other = dict(self.settings, delta=0.5)
+        self.assertFalse(is_up_to_date(filename, output, other, done))
+        self.assertFalse(is_up_to_date(filename, output, self.settings, {}))
+
+        os.utime(filename, (now + 10, now + 10))
+        self.assertFalse(is_up_to_date(filename, output, self.settings, done))
+
+    def test_output_settings(self):
+        manifest = os.path.join(self.directory, "manifest.json")
+        self.assertEqual(load_output_settings(manifest), {})
+        with open(manifest, "w") as manifest_file:
+            json.dump({"tunnels" : [
+                {"output" : "a.dsd", "status" : "done",
+                 "settings" : self.settings},
+                {"output" : "b.dsd", "status" : "failed"}]}, manifest_file)
+        self.assertEqual(load_output_settings(manifest),
+                         {"a.dsd" : self.settings})
+
+    def test_failed(self):
+        filename = os.path.join(self.directory, "missing.pdb")
+        output   = os.path.join(self.directory, "out", "missing.dsd")
+        opts     = DigOpts(0.3, filename, n_workers=1, use_cache=False)
+        record   = dig_file((filename, output, opts, self.settings, False))
+        self.assertEqual(record["status"], "failed")
+        self.assertTrue(record["reason"].startswith("IOError"))
+        self.assertNotIn("settings", record)
+        self.assertFalse(os.path.exists(output))
+        self.assertTrue(os.path.exists(record["log"]))
+
+if __name__ == '__main__':
+    unittest.main()
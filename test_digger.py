@@ -0,0 +1,135 @@
+import os
+import sys
+import unittest
+import numpy as np
+import digger
+from digger import *
+
+class TestDigOpts(unittest.TestCase):
+
+    def test_optimizer(self):
+        self.assertEqual(DigOpts(0.3, None, "nelder-mead").optimizer,
+                         "nelder-mead")
+        self.assertRaises(ValueError, DigOpts, 0.3, None, "simplex")
+
+class TestShiftNewDisk(unittest.TestCase):
+
+    def setUp(self):
+        self.opts = DigOpts(0.3, None, shift_max_iter=5, shift_tol=1e-6)
+        self.prev_disk = Disk(np.zeros(3), np.array([0., 0., 1.]), 1.)
+        self.step = digger.shift_new_disk_step
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+
+    def tearDown(self):
+        digger.shift_new_disk_step = self.step
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    # Replace refitting steps by disks at heights `heights(i)` above the
+    # previous disk in i-th iteration. Returns list of iterations done.
+    def fake_steps(self, heights):
+        calls = []
+        def step(prev_disk, new_disk, tunnel, delta, scale):
+            calls.append(scale)
+            return Disk(np.array([0., 0., heights(len(calls) - 1)]),
+                        np.array([0., 0., 1.]), 1.)
+        digger.shift_new_disk_step = step
+        return calls
+
+    def shift(self, height):
+        new_disk = Disk(np.array([0., 0., height]), np.array([0., 0., 1.]), 1.)
+        return shift_new_disk(self.prev_disk, new_disk, None, self.opts)
+
+    def test_converged(self):
+        calls = self.fake_steps(lambda i: [0.8, 0.5, 0.2, 0.1][i])
+        disk  = self.shift(1.)
+        self.assertEqual(calls, [1., 0.5, 0.25])
+        self.assertAlmostEqual(disk.center[2], 0.2)
+
+    def test_iteration_limit(self):
+        # Disks keep moving, but never get closer than delta.
+        calls = self.fake_steps(lambda i: 1. + 0.1 * i)
+        disk  = self.shift(2.)
+        self.assertEqual(len(calls), self.opts.shift_max_iter)
+        self.assertAlmostEqual(disk.center[2], 1.)
+
+    def test_tolerance(self):
+        # Disk stops moving in the second iteration.
+        calls = self.fake_steps(lambda i: 1.)
+        disk  = self.shift(2.)
+        self.assertEqual(len(calls), 2)
+        self.assertAlmostEqual(disk.center[2], 1.)
+
+    def test_fallback(self):
+        # Disks behind the previous disk do not count, the iterations go on
+        # until some disk follows.
+        calls = self.fake_steps(lambda i: -1. if i < 10 else 0.5)
+        disk  = self.shift(2.)
+        self.assertEqual(len(calls), 11)
+        self.assertAlmostEqual(disk.center[2], 0.5)
+
+        # Until the scale falls below tolerance 1e-6.
+        calls = self.fake_steps(lambda i: -1.)
+        self.assertRaises(RuntimeError, self.shift, 2.)
+        self.assertEqual(len(calls), 21)
+        self.assertLess(calls[-1], self.opts.shift_tol)
+
+class TestSharpTurn(unittest.TestCase):
+
+    # Sharp turn step refits the look-ahead disk of `is_sharp_turn`, which is
+    # found in the fit cache.
+    def test_look_ahead_reused(self):
+        sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+        from synthetic import generate_tunnel
+        centers, radii = generate_tunnel("sharp-turn", 80)
+        tunnel = Tunnel()
+        tunnel.load_from_arrays(centers, radii)
+        opts = DigOpts(0.3, None)
+
+        prev_disk = tunnel.fit_disk(centers[1] - centers[0], centers[0])
+        is_sharp_turn(tunnel, prev_disk, opts)
+        hits = tunnel.get_fit_cache_stats()["hits"]
+        tunnel.fit_disk(prev_disk.normal,
+                        prev_disk.center + prev_disk.normal * opts.look_ahead)
+        self.assertEqual(tunnel.get_fit_cache_stats()["hits"], hits + 1)
+
+class TestAdaptiveStep(unittest.TestCase):
+
+    def setUp(self):
+        sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+        self.stdout = sys.stdout
+        sys.stdout  = open(os.devnull, "w")
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    # Dig synthetic tunnel along directions of its segments. Returns disks
+    # and number of `fit_disk` calls.
+    def dig(self, shape, adaptive_step):
+        from bench_pipeline import get_bench_curve
+        from synthetic import generate_tunnel
+        centers, radii = generate_tunnel(shape, 20)
+        tunnel = Tunnel()
+        tunnel.load_from_arrays(centers, radii)
+        opts  = DigOpts(0.3, None, adaptive_step=adaptive_step)
+        disks = dig_along_curve(tunnel, get_bench_curve(tunnel), opts)
+        stats = tunnel.get_fit_cache_stats()
+        return DiskArray.from_disks(disks), stats["hits"] + stats["misses"]
+
+    def test_fewer_fits(self):
+        for shape in ("helix", "bottleneck"):
+            disks, n_fits = self.dig(shape, True)
+            self.assertLess(disks.consecutive_dists().max(), 0.3)
+            fixed_disks, fixed_n_fits = self.dig(shape, False)
+            self.assertLess(n_fits, fixed_n_fits / 2)
+            # The tunnel is covered all the same.
+            self.assertTrue(np.allclose(disks.centers[[0, -1]],
+                                        fixed_disks.centers[[0, -1]],
+                                        atol=0.3))
+
+if __name__ == '__main__':
+    unittest.main()
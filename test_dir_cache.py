@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from dir_cache import DirectionCache
+
+class FakeTunnel:
+    def __init__(self, seed):
+        rng = np.random.RandomState(seed)
+        self.centers = rng.uniform(size=(10, 3))
+        self.radii   = rng.uniform(size=10)
+
+class TestDirectionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_store_load(self):
+        cache = DirectionCache(self.directory)
+        key   = cache.get_key(FakeTunnel(0), {"optimizer" : "scan"})
+        self.assertIsNone(cache.load(key))
+
+        dirs = np.random.uniform(size=(9, 3))
+        cache.store(key, dirs)
+        self.assertTrue(np.array_equal(cache.load(key), dirs))
+
+    def test_directory(self):
+        directory = os.path.join(self.directory, "a", "b")
+        DirectionCache(directory)
+        self.assertTrue(os.path.isdir(directory))
+        # Directory created meanwhile by another run is fine.
+        DirectionCache(directory)
+
+    def test_key(self):
+        cache = DirectionCache(self.directory)
+        key   = cache.get_key(FakeTunnel(0), {"optimizer" : "scan"})
+        self.assertEqual(key, cache.get_key(FakeTunnel(0), {"optimizer" : "scan"}))
+        self.assertNotEqual(key, cache.get_key(FakeTunnel(1), {"optimizer" : "scan"}))
+        self.assertNotEqual(key, cache.get_key(FakeTunnel(0), {"optimizer" : "nelder-mead"}))
+
+    def test_eviction(self):
+        dirs  = np.zeros((100, 3))
+        cache = DirectionCache(self.directory, max_bytes=3 * (dirs.nbytes + 128))
+        keys  = [cache.get_key(FakeTunnel(i), {}) for i in xrange(3)]
+        for i, key in enumerate(keys):
+            cache.store(key, dirs)
+            # Make modification times distinct.
+            os.utime(cache._path(key), (i, i))
+        # Use of the first entry makes it most recently used one.
+        cache.load(keys[0])
+        cache.store(cache.get_key(FakeTunnel(3), {}), dirs)
+
+        self.assertIsNotNone(cache.load(keys[0]))
+        self.assertIsNone(cache.load(keys[1]))
+        self.assertIsNotNone(cache.load(keys[2]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from disk_format import *
+from geometrical_objects import Disk
+
+class TestDiskFormat(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        normals = rng.normal(size=(10, 3))
+        self.disks = DiskArray(rng.uniform(-50., 50., (10, 3)),
+            normals / np.sqrt((normals ** 2).sum(axis=1))[:, np.newaxis],
+            rng.uniform(0.5, 3., 10))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def assertSameDisks(self, disks1, disks2):
+        self.assertEqual(len(disks1), len(disks2))
+        self.assertTrue(np.array_equal(disks1.centers, disks2.centers))
+        self.assertTrue(np.array_equal(disks1.normals, disks2.normals))
+        self.assertTrue(np.array_equal(disks1.radii, disks2.radii))
+
+    def test_binary(self):
+        source = self.path("tunnel.pdb")
+        with open(source, "w") as outfile:
+            outfile.write("ATOM\n")
+        save_disks(self.disks, self.path("disks.npz"), make_header(0.3, source))
+
+        disks, header = load_disks_binary(self.path("disks.npz"))
+        self.assertSameDisks(disks, self.disks)
+        self.assertEqual(header["format_version"], FORMAT_VERSION)
+        self.assertEqual(header["delta"], 0.3)
+        self.assertEqual(header["source"], "tunnel.pdb")
+        self.assertEqual(header["source_sha1"], file_sha1(source))
+
+        # Plain `np.load` reads the same arrays.
+        with np.load(self.path("disks.npz")) as data:
+            self.assertTrue(np.array_equal(data["radii"], self.disks.radii))
+
+    def test_empty(self):
+        save_disks([], self.path("empty.npz"))
+        self.assertEqual(len(read_disks(self.path("empty.npz"))), 0)
+
+    def test_conversion(self):
+        disks = self.disks.to_disks()
+        save_disks(disks, self.path("disks.dsd"))
+        save_disks(read_disks(self.path("disks.dsd")), self.path("disks.npz"))
+        save_disks(read_disks(self.path("disks.npz")), self.path("copy.dsd"))
+        with open(self.path("disks.dsd")) as file1, \
+             open(self.path("copy.dsd")) as file2:
+            self.assertEqual(file1.read(), file2.read())
+
+        # Binary format keeps full precision.
+        save_disks(disks, self.path("disks.npz"))
+        self.assertSameDisks(read_disks(self.path("disks.npz")),
+                             DiskArray.from_disks(disks))
+
+if __name__ == '__main__':
+    unittest.main()
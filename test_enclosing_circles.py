@@ -0,0 +1,55 @@
+import itertools
+import unittest
+import numpy as np
+from enclosing_circles import *
+from enclosing_circles import _circle_2, _circle_3, _encloses
+
+# Minimal circle enclosing circles found by trying circles determined by all
+# subsets of at most three circles.
+def brute_force(centers, radii):
+    circles = zip(centers[:, 0], centers[:, 1], radii)
+    candidates = [(c[:2], c[2]) for c in circles]
+    for c1, c2 in itertools.combinations(circles, 2):
+        candidates.append(_circle_2(c1, c2))
+    for c1, c2, c3 in itertools.permutations(circles, 3):
+        candidates.append(_circle_3(c1, c2, c3))
+    radius = min(r for c, r in candidates
+                 if all(_encloses(c, r, circle) for circle in circles))
+    return radius
+
+class TestMinEnclosingCircle(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(5)
+
+    def check(self, centers, radii, radius):
+        dists = np.sqrt(((centers - self.center) ** 2).sum(axis=1))
+        self.assertTrue((dists + radii <= self.radius + 1e-8).all())
+        self.assertAlmostEqual(self.radius, radius)
+
+    def test_brute_force(self):
+        for n in [1, 2, 3, 5, 8]:
+            for __ in xrange(20):
+                centers = self.rng.uniform(-3., 3., (n, 2))
+                radii   = self.rng.uniform(0., 2., n)
+                self.center, self.radius, __ = \
+                    min_enclosing_circle(centers, radii)
+                self.check(centers, radii, brute_force(centers, radii))
+
+    def test_contained_circles(self):
+        centers = np.array([[0., 0.], [0.5, 0.], [0., 0.2]])
+        radii   = np.array([2., 0.5, 1.])
+        self.center, self.radius, support = min_enclosing_circle(centers, radii)
+        self.check(centers, radii, 2.)
+        self.assertEqual(list(support), [0])
+
+    def test_warm_start(self):
+        centers = self.rng.uniform(-3., 3., (50, 2))
+        radii   = self.rng.uniform(0., 2., 50)
+        center, radius, support = min_enclosing_circle(centers, radii)
+        self.center, self.radius, __ = \
+            min_enclosing_circle(centers, radii, support)
+        self.check(centers, radii, radius)
+
+if __name__ == '__main__':
+    unittest.main()
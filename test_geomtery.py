@@ -49,5 +49,52 @@ class TestLine(unittest.TestCase):
         line  = Line(np.array([0,0,0]), np.array([0,0,-1])) 
         self.intersection_test(plane, line, np.array([0,0,1])) 
 
+
+class TestLinalg(unittest.TestCase):
+
+    def test_orthonormal_basis(self):
+        normals = [np.array([0., 0., 1.]), np.array([0., 0., -1.]),
+                   np.array([1., 0., 0.]), normalize(np.array([1., -2., 3.])),
+                   normalize(np.array([0.3, 0.1, -1e-9]))]
+        for n in normals:
+            v1, v2 = orthonormal_basis(n)
+            self.assertAlmostEqual(np.linalg.norm(v1), 1.)
+            self.assertAlmostEqual(np.linalg.norm(v2), 1.)
+            self.assertTrue(is_perpendicular(v1, v2))
+            self.assertTrue(is_perpendicular(v1, n))
+            self.assertTrue(is_perpendicular(v2, n))
+            self.assertTrue(np.allclose(cross(v1, v2), n))
+
+    def test_orthonormal_bases(self):
+        normals = np.random.RandomState(0).normal(size=(50, 3))
+        normals = np.vstack((normals, [[0., 0., 1.], [0., 0., -1.],
+                                       [1., 0., 0.]]))
+        normals /= np.sqrt((normals ** 2).sum(axis=1))[:, np.newaxis]
+        v1s, v2s = orthonormal_bases(normals)
+        for n, v1, v2 in zip(normals, v1s, v2s):
+            b1, b2 = orthonormal_basis(n)
+            self.assertTrue(np.allclose(v1, b1))
+            self.assertTrue(np.allclose(v2, b2))
+
+    def test_plane_normal(self):
+        u = np.array([1., 0., 0.])
+        self.assertTrue(np.allclose(plane_normal(u, np.array([0., 2., 0.])),
+                                    [0., 0., 1.]))
+        self.assertTrue(is_perpendicular(plane_normal(u, -u), u))
+
+    def test_disk_dists(self):
+        normals = [[0., 0., 1.], [0., 0.1, 1.], [0., 0.1, 1.], [1., 0., 0.],
+                   [0., 0., -1.], [0.3, -0.2, 1.]]
+        disks = [Disk(np.array([0.1 * i, 0., 0.2 * i]),
+                      normalize(np.array(n)), 1. + 0.1 * i)
+                 for i, n in enumerate(normals)]
+        array = DiskArray.from_disks(disks)
+        self.assertEqual(len(array), len(disks))
+
+        expected = [disk_dist(d1, d2) for d1, d2 in zip(disks, disks[1:])]
+        self.assertTrue(np.allclose(array.consecutive_dists(), expected))
+        expected = [disk_dist(d, disks[1]) for d in disks]
+        self.assertTrue(np.allclose(array.dists_to(disks[1]), expected))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
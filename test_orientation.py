@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+import orientation
+from orientation import *
+from tunnel import Tunnel
+from tunnel_curve import TunnelCurve
+
+class TestOrientation(unittest.TestCase):
+
+    def setUp(self):
+        # Straight tunnel along x axis.
+        centers = np.column_stack((np.arange(0., 10., 0.5), np.zeros(20),
+                                   np.zeros(20)))
+        self.tunnel = Tunnel()
+        self.tunnel.load_from_arrays(centers, np.full(20, 1.5))
+        self.curve  = TunnelCurve.centerline(self.tunnel)
+        self.point  = np.array([5., 0., 0.])
+        self.init_normal = normalize(np.array([1., 0.5, 0.2]))
+        self.init_disk   = self.tunnel.fit_disk(self.init_normal, self.point)
+        self.minimize = orientation.optimize.minimize
+        self.scan = orientation.scan_search
+
+    def tearDown(self):
+        orientation.optimize.minimize = self.minimize
+        orientation.scan_search = self.scan
+
+    def check_minimal(self, disk):
+        self.assertTrue(self.curve.pass_through_disk(disk))
+        self.assertGreater(np.dot(disk.normal, self.init_normal), 0.)
+        self.assertLess(disk.radius, self.init_disk.radius)
+        self.assertAlmostEqual(disk.radius, 1.5, places=3)
+        self.assertGreater(disk.normal[0], 0.99)
+
+    def test_optimizers(self):
+        for name, search in ORIENTATION_OPTIMIZERS.iteritems():
+            self.check_minimal(search(self.tunnel, self.point, self.init_normal,
+                                      self.curve))
+
+    def test_nelder_mead_fallback(self):
+        # Simplex evaluating a few points and failing to converge.
+        class Result:
+            success = False
+        values = []
+        def minimize(objective, x0, **kwargs):
+            for x in ([0., 0.], [-0.3, -0.1], [-0.5, -0.2], [0.4, 0.]):
+                values.append(objective(np.array(x)))
+            return Result()
+        starts = []
+        def scan_search(tunnel, point, init_normal, curve, start_disk=None):
+            starts.append(start_disk)
+            return self.scan(tunnel, point, init_normal, curve, start_disk)
+        orientation.optimize.minimize = minimize
+        orientation.scan_search = scan_search
+
+        disk = nelder_mead_search(self.tunnel, self.point, self.init_normal,
+                                  self.curve)
+        self.check_minimal(disk)
+        # Scan continues from the best disk found by the simplex.
+        self.assertEqual(len(starts), 1)
+        self.assertAlmostEqual(starts[0].radius, min(values))
+        self.assertLess(min(values), self.init_disk.radius)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from pdb_reader import *
+
+ATOM_FORMAT = "ATOM  {:5d}  H   FIL T   1    {:8.3f}{:8.3f}{:8.3f}{:6.2f}{:6.2f}\n"
+
+# Layout with blank occupancy and radius in B-factor column, as by CAVER.
+BFACTOR_FORMAT = "ATOM  {:5d}  H   FIL T   1    {:8.3f}{:8.3f}{:8.3f}      {:6.2f}\n"
+
+def format_atoms(centers, radii, atom_format=ATOM_FORMAT):
+    return "".join(atom_format.format(i + 1, c[0], c[1], c[2], r, r)
+                   for i, (c, r) in enumerate(zip(centers, radii)))
+
+class TestPdbReader(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        # Coordinates filling whole columns, not separated by whitespace.
+        self.centers = np.round(rng.uniform(-999., 999., (3, 5, 3)), 3)
+        self.radii   = np.round(rng.uniform(1., 3., (3, 5)), 2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data, compress=False):
+        path = os.path.join(self.directory, name)
+        outfile = gzip.open(path, "wb") if compress else open(path, "wb")
+        outfile.write(data)
+        outfile.close()
+        return path
+
+    def test_single_tunnel(self):
+        data = "REMARK tunnel\n" + format_atoms(self.centers[0], self.radii[0])
+        centers, radii = read_tunnel(self.write("t.pdb", data))
+        self.assertTrue(np.allclose(centers, self.centers[0]))
+        self.assertTrue(np.allclose(radii, self.radii[0]))
+
+    def test_bfactor_radius(self):
+        data = format_atoms(self.centers[0], self.radii[0], BFACTOR_FORMAT)
+        data += "ATOM      1  H   FIL T   1      45.484  40.564  36.944        1.85\n"
+        centers, radii = read_tunnel(self.write("t.pdb", data))
+        self.assertTrue(np.allclose(centers[:5], self.centers[0]))
+        self.assertTrue(np.allclose(centers[5], [45.484, 40.564, 36.944]))
+        self.assertTrue(np.allclose(radii, list(self.radii[0]) + [1.85]))
+
+    def test_models(self):
+        data = ""
+        for i in xrange(3):
+            data += "MODEL {}\n".format(i + 1)
+            data += format_atoms(self.centers[i], self.radii[i])
+            data += "ENDMDL\n"
+        for compress in [False, True]:
+            path    = self.write("t.pdb.gz", data, compress)
+            tunnels = list(iter_tunnels(path))
+            self.assertEqual(len(tunnels), 3)
+            for i, (centers, radii) in enumerate(tunnels):
+                self.assertTrue(np.allclose(centers, self.centers[i]))
+                self.assertTrue(np.allclose(radii, self.radii[i]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import profiling
+
+@profiling.timed("countdown")
+def countdown(n):
+    if n > 0:
+        countdown(n - 1)
+
+class TestProfiling(unittest.TestCase):
+
+    def tearDown(self):
+        profiling.enable(False)
+        profiling.reset()
+
+    def test_disabled(self):
+        countdown(3)
+        self.assertEqual(profiling.get_stats(), {})
+
+    def test_recursion(self):
+        profiling.enable()
+        countdown(3)
+        stats = profiling.get_stats()["countdown"]
+        self.assertEqual(stats["calls"], 4)
+        self.assertEqual(stats["max_depth"], 4)
+
+    def test_merge(self):
+        profiling.enable()
+        countdown(1)
+        other = profiling.take_stats()
+        countdown(3)
+        profiling.merge(other)
+        stats = profiling.get_stats()["countdown"]
+        self.assertEqual(stats["calls"], 6)
+        self.assertEqual(stats["max_depth"], 4)
+
+    def test_counts(self):
+        profiling.record_count("loop", "iterations", 3)
+        self.assertEqual(profiling.get_stats(), {})
+
+        profiling.enable()
+        profiling.record_count("loop", "iterations", 3)
+        other = profiling.take_stats()
+        profiling.record_count("loop", "iterations", 5)
+        profiling.record_count("loop", "iterations", 1)
+        profiling.merge(other)
+        stats = profiling.get_stats()["loop"]
+        self.assertEqual(stats["iterations"], 9)
+        self.assertEqual(stats["max_iterations"], 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from geometrical_objects import *
+from spatial_index import *
+
+class TestSphereGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.spheres = [Sphere(np.array([float(i), 0., 0.]), 0.8)
+                        for i in xrange(10)]
+        self.grid = SphereGrid(self.spheres)
+
+    def test_query_point(self):
+        point = np.array([3.1, 0.2, 0.])
+        found = [i for i in self.grid.query_point(point)
+                 if self.spheres[i].ball_contains(point)]
+        required = [i for i, s in enumerate(self.spheres)
+                    if s.ball_contains(point)]
+        self.assertEqual(sorted(found), required)
+
+    def test_query_ball(self):
+        for s in self.spheres:
+            found = self.grid.query_ball(s.center, s.radius)
+            for i, other in enumerate(self.spheres):
+                if s.intersect_ball(other):
+                    self.assertIn(i, found)
+
+
+class TestCircleGraph(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.centers = rng.uniform(0., 10., (50, 2))
+        self.radii   = rng.uniform(0.2, 1., 50)
+
+    def test_overlapping_pairs(self):
+        first, second = overlapping_pairs(self.centers, self.radii)
+        found = set(tuple(sorted(p)) for p in zip(first, second))
+
+        required = set()
+        for i in xrange(50):
+            for j in xrange(i + 1, 50):
+                c1 = Circle(self.centers[i], self.radii[i])
+                c2 = Circle(self.centers[j], self.radii[j])
+                if c1.has_intersection_circle(c2):
+                    required.add((i, j))
+        self.assertEqual(found, required)
+
+    def test_overlapping_pairs_3D(self):
+        rng     = np.random.RandomState(3)
+        centers = rng.uniform(0., 10., (50, 3))
+        radii   = rng.uniform(0.5, 2., 50)
+        first, second = overlapping_pairs(centers, radii)
+        found = set(tuple(sorted(p)) for p in zip(first, second))
+
+        spheres  = [Sphere(c, r) for c, r in zip(centers, radii)]
+        required = set((i, j) for i in xrange(50) for j in xrange(i + 1, 50)
+                       if spheres[i].intersect_ball(spheres[j]))
+        self.assertEqual(found, required)
+
+    def test_connected_circles(self):
+        centers = np.array([[0., 0.], [1.5, 0.], [3., 0.], [10., 0.]])
+        radii   = np.array([1., 1., 1., 1.])
+        self.assertEqual(list(connected_circles(centers, radii, [0])),
+                         [0, 1, 2])
+        self.assertEqual(list(connected_circles(centers, radii, [3])), [3])
+        self.assertEqual(list(connected_circles(centers, radii, [])), [])
+
+class TestSegmentBVH(unittest.TestCase):
+
+    def test_query_balls(self):
+        rng    = np.random.RandomState(7)
+        points = np.cumsum(rng.uniform(-1., 1., (100, 3)), axis=0)
+        bvh    = SegmentBVH(points, leaf_size=4)
+
+        centers = rng.uniform(-5., 5., (20, 3)) + points.mean(axis=0)
+        radii   = rng.uniform(0.5, 3., 20)
+        ball_idxs, seg_idxs = bvh.query_balls(centers, radii)
+        found = set(zip(ball_idxs, seg_idxs))
+
+        # Every segment reaching a ball has to be reported.
+        for k in xrange(20):
+            for i in xrange(99):
+                t = np.linspace(0., 1., 50)[:, np.newaxis]
+                samples = points[i] + t * (points[i + 1] - points[i])
+                dists   = np.sqrt(((samples - centers[k]) ** 2).sum(axis=1))
+                if dists.min() <= radii[k]:
+                    self.assertIn((k, i), found)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import os
+import sys
+import unittest
+import numpy as np
+import trajectory
+from digger import DigOpts, dig_along_curve
+from linalg import normalize
+from tunnel import Tunnel
+from tunnel_curve import TunnelCurve
+from trajectory import *
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "benchmarks"))
+from synthetic import generate_tunnel
+
+# Curve with directions of segments between tunnel centers, so that digging
+# does not depend on solving directions of minimal disks.
+class SegmentCurve(TunnelCurve):
+    def __init__(self, tunnel, delta, opts, warm_start=None):
+        self._init_centerline(tunnel)
+        self.delta = delta
+        self.dirs  = [normalize(d) for d in self._seg_dirs]
+        self._dirs = np.array(self.dirs)
+
+def make_tunnel(centers, radii):
+    tunnel = Tunnel()
+    tunnel.load_from_arrays(centers, radii)
+    return tunnel
+
+class TestTrajectory(unittest.TestCase):
+
+    # The first frame is dug only once, tests must not modify its disks.
+    @classmethod
+    def setUpClass(cls):
+        cls.centers, cls.radii = generate_tunnel("straight", 40)
+        cls.tunnel = make_tunnel(cls.centers, cls.radii)
+        cls.opts   = DigOpts(0.3, None, n_workers=1, use_cache=False)
+        cls.curve  = trajectory.TunnelCurve
+        trajectory.TunnelCurve = SegmentCurve
+        cls.stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        cls.disks, cls.state = dig_frame(cls.tunnel, cls.opts)
+
+    @classmethod
+    def tearDownClass(cls):
+        trajectory.TunnelCurve = cls.curve
+        sys.stdout.close()
+        sys.stdout = cls.stdout
+
+    # Tunnel of the next frame with spheres `idxs` moved by `shift`.
+    def move(self, idxs, shift):
+        centers = self.centers.copy()
+        centers[idxs] += shift
+        return make_tunnel(centers, self.radii)
+
+    def assertSameDisks(self, disks1, disks2):
+        self.assertEqual(len(disks1), len(disks2))
+        for disk1, disk2 in zip(disks1, disks2):
+            self.assertTrue(np.allclose(disk1.center, disk2.center))
+            self.assertTrue(np.allclose(disk1.normal, disk2.normal))
+            self.assertAlmostEqual(disk1.radius, disk2.radius)
+
+    def test_changed_centers(self):
+        state = self.state
+        changed = find_changed_centers(self.tunnel, state, 1e-3)
+        self.assertFalse(changed.any())
+
+        tunnel  = self.move([39], [0., 0.1, 0.])
+        changed = find_changed_centers(tunnel, state, 1e-3)
+        self.assertTrue(changed[39])
+        self.assertFalse(changed[:20].any())
+        # Changed centers form the neighbourhood of the moved sphere.
+        first = np.flatnonzero(changed)[0]
+        self.assertTrue(changed[first:].all())
+
+        changed = find_changed_centers(self.move([39], [0., 1e-4, 0.]),
+                                       state, 1e-3)
+        self.assertFalse(changed.any())
+
+    def test_first_changed_segment(self):
+        curve   = SegmentCurve(self.tunnel, 6., self.opts)
+        changed = np.zeros(40, dtype=bool)
+        self.assertEqual(find_first_changed_segment(curve, changed), 39)
+
+        changed[30] = True
+        # The first segment whose weighted directions reach center 30.
+        first = find_first_changed_segment(curve, changed)
+        self.assertEqual(first, min(i for i in xrange(30)
+            if curve._center_distance_from_point(30, i, 0.) < curve.delta))
+        self.assertTrue(0 < first < 29)
+        curve.delta = 0.1
+        self.assertEqual(find_first_changed_segment(curve, changed), 29)
+
+        changed[0] = True
+        self.assertEqual(find_first_changed_segment(curve, changed), 0)
+
+    def test_unchanged(self):
+        disks, state = self.disks, self.state
+        tunnel = self.move([], 0.)
+        warm_disks, warm_state = dig_frame_warm(tunnel, self.opts, state, 1e-3)
+        self.assertIs(warm_disks, disks)
+        self.assertIs(warm_state.checkpoints, state.checkpoints)
+
+    def test_partly_changed(self):
+        disks, state = self.disks, self.state
+        tunnel = self.move([39], [0., 0.1, 0.])
+        warm_disks, warm_state = dig_frame_warm(tunnel, self.opts, state, 1e-3)
+
+        first = find_first_changed_segment(
+            SegmentCurve(tunnel, 6., self.opts),
+            find_changed_centers(tunnel, state, 1e-3))
+        self.assertTrue(0 < first < 39)
+        # Disks before the first changed segment are reused.
+        n_disks = state.checkpoints[first][0]
+        for i in xrange(n_disks - 1):
+            self.assertIs(warm_disks[i], disks[i])
+        self.assertEqual(len(warm_state.checkpoints), 39)
+        self.assertSameDisks(warm_disks, dig_frame(tunnel, self.opts)[0])
+
+    def test_fully_changed(self):
+        disks, state = self.disks, self.state
+        tunnel = self.move(range(40), [0., 0.1, 0.])
+        warm_disks, __ = dig_frame_warm(tunnel, self.opts, state, 1e-3)
+        self.assertIsNot(warm_disks[0], disks[0])
+        self.assertSameDisks(warm_disks, dig_frame(tunnel, self.opts)[0])
+
+    # Drift under tolerance between frames adds up until the spheres are
+    # solved again.
+    def test_cumulative_drift(self):
+        disks, state = self.disks, self.state
+        solved = []
+        for frame in xrange(1, 5):
+            tunnel = self.move([39], [0., 0.0009 * frame, 0.])
+            prev_disks = disks
+            disks, state = dig_frame_warm(tunnel, self.opts, state, 1e-3)
+            solved.append(disks is not prev_disks)
+            # Reference of the drifting sphere is where it was solved.
+            shift = 0.0009 * (frame - frame % 2)
+            self.assertTrue(np.allclose(state.centers[39],
+                                        self.centers[39] + [0., shift, 0.]))
+            self.assertTrue(np.array_equal(state.centers[:39],
+                                           self.centers[:39]))
+        self.assertEqual(solved, [False, True, False, True])
+        self.assertSameDisks(disks, dig_frame(tunnel, self.opts)[0])
+
+    # Digging resumed from any checkpoint equals digging from scratch.
+    def test_resume(self):
+        curve = SegmentCurve(self.tunnel, 6., self.opts)
+        checkpoints = []
+        disks = dig_along_curve(self.tunnel, curve, self.opts,
+                                checkpoints=checkpoints)
+        self.assertEqual(len(checkpoints), 39)
+        for segment in (1, 17, 38):
+            n_disks, last_disk = checkpoints[segment]
+            resumed_checkpoints = checkpoints[:segment]
+            resumed = dig_along_curve(self.tunnel, curve, self.opts,
+                                      disks[:n_disks - 1] + [last_disk],
+                                      segment, resumed_checkpoints)
+            self.assertSameDisks(resumed, disks)
+            self.assertEqual(len(resumed_checkpoints), 39)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import sys
+import unittest
+import numpy as np
+import profiling
+from enclosing_circles import min_enclosing_circle
+from tunnel import *
+from tunnel_curve import TunnelCurve
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "benchmarks"))
+from synthetic import generate_tunnel
+
+def make_tunnel(centers, radii):
+    tunnel = Tunnel()
+    tunnel.load_from_arrays(np.array(centers, dtype=float),
+                            np.array(radii, dtype=float))
+    return tunnel
+
+class TestContainedSpheres(unittest.TestCase):
+
+    def test_concentric(self):
+        # The smaller of concentric spheres is contained, whatever the order.
+        centers = [[0., 0., 0.], [0., 0., 0.], [1.5, 0., 0.]]
+        for radii, contained in (([0.5, 2., 1.], [0]), ([2., 0.5, 1.], [1])):
+            tunnel = make_tunnel(centers, radii)
+            self.assertEqual(tunnel.find_contained_spheres(), contained)
+
+            tunnel.check_requirements(drop_contained=True)
+            self.assertEqual(sorted(s.radius for s in tunnel.t), [1., 2.])
+
+    def test_identical(self):
+        tunnel = make_tunnel([[0., 0., 0.], [1., 0., 0.], [1., 0., 0.]],
+                             [1., 1., 1.])
+        self.assertEqual(tunnel.find_contained_spheres(), [2])
+
+    def test_contained(self):
+        tunnel = make_tunnel([[0., 0., 0.], [0.5, 0., 0.], [2., 0., 0.]],
+                             [2., 1., 1.])
+        self.assertEqual(tunnel.find_contained_spheres(), [1])
+        self.assertRaises(ValueError, tunnel.check_requirements)
+
+class TestFitDisks(unittest.TestCase):
+
+    def setUp(self):
+        centers, radii = generate_tunnel("helix", 80)
+        self.tunnel = make_tunnel(centers, radii)
+        self.curve  = TunnelCurve.centerline(self.tunnel)
+        rng = np.random.RandomState(0)
+        self.point   = centers[40] + rng.normal(scale=0.2, size=3)
+        self.normals = [normalize(centers[41] - centers[39]
+                                  + rng.normal(scale=0.5, size=3))
+                        for __ in xrange(30)]
+
+    def assertSameDisk(self, disk1, disk2):
+        self.assertTrue(np.allclose(disk1.center, disk2.center))
+        self.assertTrue(np.allclose(disk1.normal, disk2.normal))
+        self.assertAlmostEqual(disk1.radius, disk2.radius)
+
+    def test_fit_disks(self):
+        disks = self.tunnel.fit_disks(self.normals, self.point)
+        for normal, disk in zip(self.normals, disks):
+            self.assertSameDisk(disk, self.tunnel.fit_disk(normal, self.point))
+
+    # Cuts of batched fits are profiled with those of single fits.
+    def test_profiled_cuts(self):
+        profiling.enable()
+        try:
+            self.tunnel.fit_disks(self.normals, self.point)
+            stats = profiling.get_stats()
+        finally:
+            profiling.enable(False)
+            profiling.reset()
+        self.assertEqual(stats["get_cut_circles"]["calls"], 1)
+
+    def test_evaluate_normals(self):
+        disks, radii, passes = self.tunnel.evaluate_normals(self.normals,
+                                                            self.point,
+                                                            self.curve)
+        for k, normal in enumerate(self.normals):
+            disk = self.tunnel.fit_disk(normal, self.point)
+            self.assertSameDisk(disks[k], disk)
+            self.assertAlmostEqual(radii[k], disk.radius)
+            self.assertEqual(passes[k], self.curve.pass_through_disk(disk))
+
+class TestFitCache(unittest.TestCase):
+
+    def setUp(self):
+        centers, radii = generate_tunnel("helix", 40)
+        self.tunnel = make_tunnel(centers, radii)
+        self.normal = centers[21] - centers[19]
+        self.point  = centers[20]
+
+    def test_hit(self):
+        disk = self.tunnel.fit_disk(self.normal, self.point)
+        hit  = self.tunnel.fit_disk(self.normal, self.point)
+        self.assertEqual(self.tunnel.get_fit_cache_stats()["hits"], 1)
+        self.assertIsNot(hit, disk)
+        fresh = self.tunnel._fit_disk(normalize(self.normal), self.point)
+        self.assertTrue(np.array_equal(hit.center, fresh.center))
+        self.assertTrue(np.array_equal(hit.normal, fresh.normal))
+        self.assertEqual(hit.radius, fresh.radius)
+
+    def test_profiled(self):
+        profiling.enable()
+        try:
+            for __ in xrange(3):
+                self.tunnel.fit_disk(self.normal, self.point)
+            stats = profiling.get_stats()["fit_disk"]
+        finally:
+            profiling.enable(False)
+            profiling.reset()
+        self.assertEqual(stats["cache_hits"], 2)
+        self.assertEqual(stats["cache_misses"], 1)
+
+    def test_copy(self):
+        disk   = self.tunnel.fit_disk(self.normal, self.point)
+        center = disk.center.copy()
+        disk.center += 1.
+        disk.normal *= -1.
+        disk.radius  = 0.
+        hit = self.tunnel.fit_disk(self.normal, self.point)
+        self.assertTrue(np.array_equal(hit.center, center))
+        self.assertTrue(np.allclose(hit.normal, normalize(self.normal)))
+        self.assertGreater(hit.radius, 0.)
+
+class TestSupportWarmStart(unittest.TestCase):
+
+    def tearDown(self):
+        profiling.enable(False)
+        profiling.reset()
+
+    # Minimal circles of consecutive cuts, warm started by support of the
+    # previous one, equal cold solutions.
+    def test_cold_equal(self):
+        profiling.enable()
+        centers, radii = generate_tunnel("helix", 40)
+        tunnel = make_tunnel(centers, radii)
+        for i in xrange(1, len(centers) - 1):
+            for point in np.linspace(centers[i - 1], centers[i], 4):
+                plane = Plane(point, centers[i + 1] - centers[i - 1])
+                idxs, circ_centers, circ_radii = \
+                    tunnel.get_cut_circles(plane, point)
+                t, u, radius = tunnel._get_min_circle(circ_centers,
+                                                      circ_radii, idxs)
+                center, cold_radius, __ = min_enclosing_circle(circ_centers,
+                                                               circ_radii)
+                self.assertTrue(np.allclose((t, u), center))
+                self.assertAlmostEqual(radius, cold_radius)
+
+        stats = tunnel.get_support_stats()
+        self.assertGreater(stats["hits"], 0)
+        self.assertGreater(stats["fails"], 0)
+        profiled = profiling.get_stats()["get_min_sphere2D"]
+        self.assertEqual(profiled["support_hits"], stats["hits"])
+        self.assertEqual(profiled["support_fails"], stats["fails"])
+
+if __name__ == '__main__':
+    unittest.main()
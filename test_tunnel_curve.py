@@ -0,0 +1,154 @@
+import os
+import sys
+import unittest
+import numpy as np
+from digger import DigOpts
+from geometrical_objects import *
+from orientation import ORIENTATION_OPTIMIZERS
+from tunnel import Tunnel
+from tunnel_curve import TunnelCurve
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "benchmarks"))
+from synthetic import SHAPES, generate_tunnel
+
+# Original scalar pass-through test, checking every centerline segment.
+def pass_through_disk_scalar(centers, disk):
+    first_pass_sgn = None
+    last_pass_sgn = None
+    split = None
+
+    for i in xrange(len(centers) - 1):
+        seg = Segment(centers[i], centers[i + 1])
+        if seg.intersection_disk(disk) is None:
+            continue
+        d = centers[i + 1] - centers[i]
+        d_sgn = np.sign(np.dot(disk.normal, d))
+        if disk.contains(centers[i + 1]):
+            split = split if split is not None else d
+        elif split is not None:
+            sgn = d_sgn * np.sign(np.dot(disk.normal, split))
+            if sgn > 0:
+                first_pass_sgn = first_pass_sgn or d_sgn
+                last_pass_sgn = d_sgn
+            split = None
+        else:
+            first_pass_sgn = first_pass_sgn or d_sgn
+            last_pass_sgn = d_sgn
+    return first_pass_sgn is not None and first_pass_sgn == last_pass_sgn
+
+# Original distance of center `c` from point in distance `d` from the
+# beginning of segment `i`, walking along the centerline.
+def center_distance_scalar(centers, c, i, d):
+    step = np.sign(i - c)
+    dist = 0.
+    while c != i:
+        dist += np.linalg.norm(centers[c + 1] - centers[c])
+        c += step
+    if step >= 0:
+        dist += d
+    else:
+        dist -= np.linalg.norm(centers[c + 1] - centers[c]) - d
+    return dist
+
+# Original weighted direction, summing over all centers.
+def weighted_dir_scalar(curve, i, d):
+    w_dir = np.zeros(3)
+    for j in xrange(len(curve.dirs)):
+        dist = center_distance_scalar(curve.centers, j, i, d)
+        if dist < curve.delta:
+            w_dir += curve.dirs[j] * (curve.delta - dist) ** 3
+    return normalize(w_dir)
+
+class TestWeightedDir(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        centers = np.cumsum(rng.uniform(0.1, 1., (40, 3)), axis=0)
+        tunnel  = Tunnel()
+        tunnel.load_from_arrays(centers, np.ones(40))
+        self.curve = TunnelCurve.centerline(tunnel)
+        self.curve.delta = 3.
+        self.curve.dirs  = [normalize(d) for d in rng.normal(size=(39, 3))]
+        self.curve._dirs = np.array(self.curve.dirs)
+        self.params = [(i, f * self.curve._seg_lens[i])
+                       for i in xrange(39) for f in (0., 0.3, 1.)]
+
+    def test_center_distance(self):
+        for i, d in self.params:
+            for c in xrange(39):
+                self.assertAlmostEqual(
+                    self.curve._center_distance_from_point(c, i, d),
+                    center_distance_scalar(self.curve.centers, c, i, d))
+
+    def test_weighted_dir(self):
+        for i, d in self.params:
+            self.assertTrue(np.allclose(self.curve.get_weighted_dir(i, d),
+                                        weighted_dir_scalar(self.curve, i, d)))
+
+class TestPassThroughDisks(unittest.TestCase):
+
+    def test_synthetic(self):
+        rng = np.random.RandomState(0)
+        for shape in sorted(SHAPES):
+            centers, radii = generate_tunnel(shape, 60)
+            tunnel = Tunnel()
+            tunnel.load_from_arrays(centers, radii)
+            curve = TunnelCurve.centerline(tunnel)
+
+            # Disks in tunnel centers with random normals, both passed and
+            # not passed through.
+            idxs  = rng.randint(0, len(centers) - 1, 40)
+            disks = [Disk(centers[i] + rng.normal(scale=0.2, size=3),
+                          rng.normal(size=3), rng.uniform(0.5, 4.))
+                     for i in idxs]
+            expected = [pass_through_disk_scalar(curve.centers, disk)
+                        for disk in disks]
+            self.assertTrue(any(expected) and not all(expected))
+            self.assertEqual(list(curve.pass_through_disks(disks)), expected)
+            self.assertEqual([curve.pass_through_disk(d) for d in disks],
+                             expected)
+
+def failing_search(tunnel, point, init_normal, curve):
+    raise ValueError("search failed in {}".format(point))
+
+class TestSolveDirs(unittest.TestCase):
+
+    def setUp(self):
+        centers, radii = generate_tunnel("helix", 10)
+        self.tunnel = Tunnel()
+        self.tunnel.load_from_arrays(centers, radii)
+        self.stdout = sys.stdout
+        sys.stdout  = open(os.devnull, "w")
+
+    def tearDown(self):
+        ORIENTATION_OPTIMIZERS.pop("failing", None)
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def get_dirs(self, n_workers, optimizer="scan", warm_start=None):
+        opts = DigOpts(0.3, None, optimizer, n_workers=n_workers,
+                       use_cache=False)
+        return TunnelCurve(self.tunnel, 6., opts, warm_start).dirs
+
+    # Pool of workers gives the same directions, in the same order, as
+    # solving in process.
+    def test_pool(self):
+        dirs = self.get_dirs(1)
+        self.assertEqual(len(dirs), 9)
+        self.assertTrue(np.allclose(self.get_dirs(3), dirs))
+
+        prev_dirs = [-d for d in dirs]
+        changed   = np.arange(9) % 2 == 0
+        warm_dirs = self.get_dirs(3, warm_start=(prev_dirs, changed))
+        self.assertTrue(np.allclose(warm_dirs, self.get_dirs(
+            1, warm_start=(prev_dirs, changed))))
+        self.assertTrue(np.allclose(np.array(warm_dirs)[~changed],
+                                    np.array(prev_dirs)[~changed]))
+
+    def test_worker_failure(self):
+        ORIENTATION_OPTIMIZERS["failing"] = failing_search
+        self.assertRaisesRegexp(ValueError, "search failed",
+                                self.get_dirs, 2, "failing")
+
+if __name__ == '__main__':
+    unittest.main()
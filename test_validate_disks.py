@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+from geometrical_objects import DiskArray
+from validate_disks import *
+
+class TestValidateDisks(unittest.TestCase):
+
+    def setUp(self):
+        # Straight tunnel of unit spheres along x axis, disks perpendicular to
+        # it.
+        self.centers = np.column_stack((np.arange(0., 5., 0.5),
+                                        np.zeros(10), np.zeros(10)))
+        self.radii   = np.ones(10)
+        xs = np.arange(0., 4.5, 0.25)
+        self.disks = DiskArray(np.column_stack((xs, np.zeros(len(xs)),
+                                                np.zeros(len(xs)))),
+                               np.tile([1., 0., 0.], (len(xs), 1)),
+                               np.ones(len(xs)))
+
+    def validate(self, delta=0.3):
+        return validate(self.disks, self.centers, self.radii, delta)
+
+    def test_valid(self):
+        for name, idxs in self.validate().iteritems():
+            self.assertEqual(len(idxs), 0, name)
+
+    def test_distance(self):
+        self.assertEqual(list(self.validate(0.2)["distance"]),
+                         range(len(self.disks) - 1))
+
+    def test_order(self):
+        self.disks.centers[[3, 4]] = self.disks.centers[[4, 3]]
+        self.assertEqual(list(self.validate()["order"]), [3])
+
+    def test_follower(self):
+        # Tilted disk has a vertex behind the previous disk and the next disk
+        # has a vertex behind it.
+        self.disks.normals[5] = [1., 1., 0.] / np.sqrt(2.)
+        failures = self.validate()
+        self.assertEqual(list(failures["follower"]), [4, 5])
+        self.assertEqual(len(failures["order"]), 0)
+
+    def test_coverage(self):
+        self.disks.radii[2] = 0.5
+        self.disks.centers[7] = [2., 5., 0.]
+        self.assertEqual(list(self.validate()["coverage"]), [2, 7])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import numpy as np
+
+from digger import dig_along_curve
+from tunnel_curve import TunnelCurve
+
+# Discretization of the same tunnel in consecutive frames of molecular
+# dynamics trajectory. Spheres of the tunnel drift only slightly between
+# frames, so every frame is warm started from the previous one:
+# - directions of centers whose neighbourhood did not change are reused,
+#   the others are solved again starting from their previous direction,
+# - disks are reused up to the first segment between tunnel centers affected
+#   by the change, digging is resumed from there.
+# Spheres are considered unchanged if both their center and radius moved by
+# less than `tolerance` since the frame in which results depending on them
+# were solved, so that slow drift is not lost between frames. Frames with
+# different number of spheres are solved from scratch.
+
+# Neighbourhood of tunnel center, which influences its direction, is ball of
+# `NEIGHBOURHOOD_REACH` times radius of the center's sphere.
+NEIGHBOURHOOD_REACH = 2.
+
+# Result of discretization of single frame, needed to warm start the next one.
+# Reference position of every sphere, `centers` and `radii`, is its position in
+# the frame its dependent results were solved in, the current frame unless
+# given by `moved` mask of spheres updated in the current frame.
+class FrameState:
+    def __init__(self, tunnel, curve, disks, checkpoints, prev_state=None,
+                 moved=None):
+        self.centers = np.array(tunnel.centers, dtype=float)
+        self.radii   = np.array(tunnel.radii, dtype=float)
+        if prev_state is not None:
+            self.centers[~moved] = prev_state.centers[~moved]
+            self.radii[~moved]   = prev_state.radii[~moved]
+        self.dirs    = np.array(curve.dirs, dtype=float).reshape(-1, 3)
+        self.disks   = disks
+        self.checkpoints = checkpoints
+
+# Dig disks of every tunnel from `tunnels`, consecutive frames of trajectory.
+# Yields list of disks for every frame.
+def dig_trajectory(tunnels, opts, tolerance=1e-3):
+    state = None
+    for frame, tunnel in enumerate(tunnels):
+        print "Processing frame NO. {}".format(frame)
+        if state is not None and len(state.radii) == len(tunnel.t):
+            disks, state = dig_frame_warm(tunnel, opts, state, tolerance)
+        else:
+            disks, state = dig_frame(tunnel, opts)
+        yield disks
+
+def dig_frame(tunnel, opts):
+    curve = TunnelCurve(tunnel, 6., opts)
+    checkpoints = []
+    disks = dig_along_curve(tunnel, curve, opts, checkpoints=checkpoints)
+    return disks, FrameState(tunnel, curve, disks, checkpoints)
+
+def dig_frame_warm(tunnel, opts, state, tolerance):
+    moved   = find_moved_spheres(tunnel, state, tolerance)
+    changed = find_changed_centers(tunnel, state, tolerance, moved)
+    curve   = TunnelCurve(tunnel, 6., opts,
+                          warm_start=(state.dirs, changed[:-1]))
+
+    first_segment = find_first_changed_segment(curve, changed)
+    if first_segment == 0:
+        checkpoints = []
+        disks = dig_along_curve(tunnel, curve, opts, checkpoints=checkpoints)
+    elif first_segment == len(state.checkpoints):
+        print "Reusing all disks."
+        checkpoints = state.checkpoints
+        disks = state.disks
+    else:
+        print "Reusing disks of {} segments.".format(first_segment)
+        n_disks, last_disk = state.checkpoints[first_segment]
+        checkpoints = state.checkpoints[:first_segment]
+        disks = state.disks[:n_disks - 1] + [last_disk]
+        disks = dig_along_curve(tunnel, curve, opts, disks, first_segment,
+                                checkpoints)
+    return disks, FrameState(tunnel, curve, disks, checkpoints, state, moved)
+
+# Return mask of spheres that moved by at least `tolerance` since their
+# reference position in `state`.
+def find_moved_spheres(tunnel, state, tolerance):
+    shifts = np.sqrt(((tunnel.centers - state.centers) ** 2).sum(axis=1)) \
+        + np.abs(tunnel.radii - state.radii)
+    return shifts >= tolerance
+
+# Return mask of tunnel centers whose neighbourhood contains sphere that moved
+# by at least `tolerance` since frame given by `state`, see
+# `find_moved_spheres`.
+def find_changed_centers(tunnel, state, tolerance, moved=None):
+    if moved is None:
+        moved = find_moved_spheres(tunnel, state, tolerance)
+
+    changed = np.zeros(len(tunnel.t), dtype=bool)
+    if not moved.any():
+        return changed
+    for i, (center, radius) in enumerate(zip(tunnel.centers, tunnel.radii)):
+        reach = NEIGHBOURHOOD_REACH * radius
+        idxs  = np.array(tunnel.index.query_ball(center, reach), dtype=int)
+        idxs  = idxs[moved[idxs]]
+        dists = np.sqrt(((tunnel.centers[idxs] - center) ** 2).sum(axis=1))
+        changed[i] = (dists <= reach + tunnel.radii[idxs]).any()
+    return changed
+
+# Index of the first segment between tunnel centers, whose disks depend on
+# some changed center, either directly or through weighted direction of
+# `curve` (see `TunnelCurve.get_weighted_dir`). Number of segments if there
+# is no such segment.
+def find_first_changed_segment(curve, changed):
+    n_segments = len(changed) - 1
+    idxs = np.flatnonzero(changed)
+    if len(idxs) == 0:
+        return n_segments
+
+    # Segment is dug between its both centers.
+    c     = idxs[0]
+    first = max(c - 1, 0)
+    if c < n_segments:
+        # Direction of center `c` contributes to segment `i < c` if it is
+        # closer than `curve.delta` to the beginning of the segment. Other
+        # changed directions are farther.
+        arc   = curve._arc_lens
+        dists = arc[c + 1] - arc[1:c + 1] - curve._seg_lens[:c]
+        near  = np.flatnonzero(dists < curve.delta)
+        if len(near) > 0:
+            first = min(first, near[0])
+    return first
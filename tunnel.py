@@ -1,32 +1,88 @@
-import minball
 import numpy as np
 import scipy
 import time
 import random
-from scipy import optimize
+from enclosing_circles import EPS, min_enclosing_circle
 from geometrical_objects import *
 from linalg import *
+from orientation import ORIENTATION_OPTIMIZERS
+from pdb_reader import iter_tunnels, read_tunnel
+from profiling import record_count, timed
+from spatial_index import SphereGrid, connected_circles, overlapping_pairs
+
+# Compiled solver of minimal enclosing circles is optional, the in-tree
+# `min_enclosing_circle` is used without it.
+try:
+    import minball
+except ImportError:
+    minball = None
+
+# Name of solver of minimal enclosing circles in use.
+def get_min_circle_solver():
+    return "enclosing_circles" if minball is None else "minball"
+
+# Fitted disks are memoized by their pose, center and normal quantized to
+# `FIT_CACHE_QUANTUM`. Every step of `dig_along_curve` in a sharp turn refits
+# the look-ahead disk just fitted by `is_sharp_turn`, which is then for free,
+# e.g. 21% of fits of an 80-sphere sharp turn tunnel. Tunnels without sharp
+# turns get almost no hits, costing just the lookup. The cache is dropped
+# whenever it grows over `FIT_CACHE_SIZE` entries.
+FIT_CACHE_QUANTUM = 1e-9
+FIT_CACHE_SIZE    = 100000
+
+# Distance from minimal circle under which circles count as touching it.
+SUPPORT_TOLERANCE = 1e-7
 
 class Tunnel:
 
-    def load_from_file(self, filename):
+    def __init__(self):
         self.t = []
-        infile = file(filename)
-
-        for line in infile.readlines():
-            words = line.split()
-            #print words
-            if len(words) > 0 and words[0] == "ATOM":
-                center = np.array([float(words[6]), float(words[7]), float(words[8])])
-                radius = float(words[9])
-                self.t.append(Sphere(center, radius));
-            # else:
-                # print "Unexpected data: " + line
-
-        infile.close()
-        self.check_requirements()
+        # Number of disks fitted so far.
+        self.n_fits = 0
+        self.fit_cache  = {}
+        self.fit_hits   = 0
+        self.fit_misses = 0
+        # Indices of spheres whose cut circles defined the last fitted disk,
+        # tried first by the next fit, see `_get_min_circle`.
+        self.last_support  = np.zeros(0, dtype=int)
+        self.support_hits  = 0
+        self.support_fails = 0
+
+    # Load tunnel from PDB file (the first one if file holds more of them, see
+    # `load_tunnels`). Spheres contained in other spheres make the tunnel
+    # invalid, unless `drop_contained` is set, in which case they are removed.
+    @timed("load_from_file")
+    def load_from_file(self, filename, drop_contained=False):
+        centers, radii = read_tunnel(filename)
+        self._load_checked(centers, radii, drop_contained)
         print "Tunnel readed (" + str(len(self.t)) + " spheres)."
 
+    def _load_checked(self, centers, radii, drop_contained):
+        self.t = [Sphere(c, r) for c, r in zip(centers, radii)]
+        self.check_requirements(drop_contained)
+        if len(self.t) == len(radii):
+            self.build_index(centers, radii)
+        else:
+            self.build_index()
+
+    # Load tunnel from arrays of sphere `centers` (N x 3) and `radii` (N). The
+    # arrays are used without copying, so they may live in shared memory.
+    def load_from_arrays(self, centers, radii):
+        self.t = [Sphere(c, r) for c, r in zip(centers, radii)]
+        self.build_index(centers, radii)
+
+    # Build array representation and spatial index of tunnel spheres. Has to
+    # be called again whenever `self.t` is modified.
+    def build_index(self, centers=None, radii=None):
+        if centers is None or radii is None:
+            centers = np.array([s.center for s in self.t], dtype=float)
+            radii   = np.array([s.radius for s in self.t], dtype=float)
+        self.centers = centers
+        self.radii   = radii
+        self.index   = SphereGrid(self.t)
+        self.fit_cache = {}
+        self.last_support = np.zeros(0, dtype=int)
+
     def get_neighbors(self, sphere_idx):
         first = None
         last  = None
@@ -43,106 +99,231 @@ class Tunnel:
 
     # Return all spheres containing given point
     def get_all_containing_point(self, point):
-        spheres = []
-        for s in self.t:
-            if s.ball_contains(point):
-                spheres.append(s)
-        return spheres;
+        return [self.t[i] for i in self._get_containing_point_idxs(point)]
+
+    def _get_containing_point_idxs(self, point):
+        return [i for i in self.index.query_point(point)
+                if self.t[i].ball_contains(point)]
 
+    # Return all spheres whose cuts by `plane` are connected (through
+    # overlapping cut circles) to cuts of spheres containing `center`.
     def get_all_intersecting_disk(self, plane, center):
-        # print "Containing center %d" % len(self.get_all_containing_point(center))
-        cont_spheres = self.get_all_containing_point(center)
-        inters       = []
-        inter_circs  = set(plane.intersection_sphere(s) for s in cont_spheres)
-
-        circles_count = 0
-
-        while len(inter_circs) != circles_count:
-            circles_count = len(inter_circs)
-            for s1 in self.t:
-                c1 = plane.intersection_sphere(s1)
-                if c1 is None:
-                    continue
-                for ref_circle in set(inter_circs):
-                    if ref_circle.has_intersection_circle(c1):
-                        inters.append(s1)
-                        inter_circs.add(c1)
-                        break
-        return inters
-
-    def check_requirements(self):
-        for i, s1 in enumerate(self.t):
-            for s2 in self.t[i+1:]:
-                assert(not s1.contains_sphere(s2))
-                assert(not s2.contains_sphere(s1))
+        idxs, __, __ = self.get_cut_circles(plane, center)
+        return [self.t[i] for i in idxs]
+
+    # Same as `get_all_intersecting_disk`, but returns indices of the spheres
+    # together with parametric centers and radii of their cut circles.
+    @timed("get_cut_circles")
+    def get_cut_circles(self, plane, center):
+        idxs, circ_centers, circ_radii = \
+            plane.intersection_spheres(self.centers, self.radii)
+        # Position of sphere cut in the arrays above, -1 if not cut at all.
+        cut_pos = np.full(len(self.t), -1, dtype=int)
+        cut_pos[idxs] = np.arange(len(idxs))
+
+        seeds = cut_pos[self._get_containing_point_idxs(center)]
+        found = connected_circles(circ_centers, circ_radii, seeds[seeds >= 0])
+        return idxs[found], circ_centers[found], circ_radii[found]
+
+    # Check that no sphere is contained in another one. Offending spheres are
+    # either reported all at once, or removed if `drop_contained` is set.
+    @timed("check_requirements")
+    def check_requirements(self, drop_contained=False):
+        contained = self.find_contained_spheres()
+        if len(contained) == 0:
+            return
+        if not drop_contained:
+            raise ValueError("Spheres contained in other spheres: {}"
+                             .format(", ".join(str(i) for i in contained)))
+
+        print "Dropping {} contained spheres: {}".format(len(contained),
+            ", ".join(str(i) for i in contained))
+        contained = set(contained)
+        self.t = [s for i, s in enumerate(self.t) if i not in contained]
 
+    # Return sorted indices of spheres contained in some other sphere (see
+    # `Sphere.contains_sphere`). Of two identical spheres only the latter one
+    # is reported.
+    def find_contained_spheres(self):
+        centers = np.array([s.center for s in self.t], dtype=float)
+        radii   = np.array([s.radius for s in self.t], dtype=float)
+        centers = centers.reshape(len(self.t), 3)
+
+        # Only overlapping spheres can contain each other.
+        first, second = overlapping_pairs(centers, radii)
+        first, second = np.minimum(first, second), np.maximum(first, second)
+        dists = np.sqrt(((centers[first] - centers[second]) ** 2).sum(axis=1))
+        # Of concentric spheres the smaller one is contained, of spheres equal
+        # within `f_error` the later one.
+        first_contains  = dists + radii[second] - radii[first] < f_error
+        second_contains = dists + radii[first] - radii[second] < f_error
+
+        contained = np.where(first_contains, second, first)
+        contained = contained[first_contains | second_contains]
+        return sorted(set(int(i) for i in contained))
+
+    # Fit disk with given `normal` in the tunnel cut by plane going through
+    # `center`. Results are memoized, see `FIT_CACHE_QUANTUM`.
     def fit_disk(self, normal, center):
-        disk_plane  = Plane(center, normal)
-        circle_cuts = []
+        normal = normalize(normal)
+        key    = tuple(np.round(np.concatenate((center, normal))
+                                / FIT_CACHE_QUANTUM))
+        disk   = self.fit_cache.get(key)
+        if disk is None:
+            self.fit_misses += 1
+            record_count("fit_disk", "cache_misses", 1)
+            disk = self._fit_disk(normal, center)
+            if len(self.fit_cache) >= FIT_CACHE_SIZE:
+                self.fit_cache.clear()
+            self.fit_cache[key] = disk
+        else:
+            self.fit_hits += 1
+            record_count("fit_disk", "cache_hits", 1)
+        # Callers may modify the disk.
+        return Disk(disk.center.copy(), disk.normal.copy(), disk.radius)
 
-        for sphere in self.get_all_intersecting_disk(disk_plane, center):
-            # calculate center of cap that we get by intersection disk_plane
-            # and sphere
-            cut_circle = disk_plane.intersection_sphere(sphere)
-            assert cut_circle is not None
+    # Hits and misses of `fit_disk` memoization, recorded by profiling as
+    # well.
+    def get_fit_cache_stats(self):
+        total = self.fit_hits + self.fit_misses
+        return {"hits"     : self.fit_hits,
+                "misses"   : self.fit_misses,
+                "hit_rate" : float(self.fit_hits) / total if total else 0.}
 
-            circle_cuts.append(cut_circle)
-        assert circle_cuts
+    # Hits and fails of the support of the previous fit, see
+    # `_get_min_circle`.
+    def get_support_stats(self):
+        total = self.support_hits + self.support_fails
+        return {"hits"     : self.support_hits,
+                "fails"    : self.support_fails,
+                "hit_rate" : float(self.support_hits) / total if total else 0.}
 
-        circles = []
-        # print "{"
-        for c in circle_cuts:
-            # print "%s,"% c.to_geogebra()
-            circles.append(minball.Sphere2D(list(c.center), c.radius))
-        # print "}"
+    @timed("fit_disk")
+    def _fit_disk(self, normal, center):
+        self.n_fits += 1
+        disk_plane = Plane(center, normal)
+        idxs, circ_centers, circ_radii = self.get_cut_circles(disk_plane, center)
+        assert len(circ_radii) > 0
 
-        min_circle = minball.get_min_sphere2D(circles)
-        t, u = min_circle.center
-        radius = min_circle.radius
+        t, u, radius = self._get_min_circle(circ_centers, circ_radii, idxs)
 
         new_center = disk_plane.get_point_for_param(t, u)
         assert disk_plane.contains(new_center)
         return Disk(new_center, normal, radius)
 
-    def find_minimal_disk(self, point, init_normal, curve):
-        def get_axes(normal):
-            axis1 = null_space(np.array([normal, null_vec, null_vec]))
-            axis2 = null_space(np.array([normal, axis1, null_vec]))
-            return axis1, axis2
-
-        def get_rotated_disk(base_normal, theta, phi, axes):
-            axis1, axis2 = axes
-            v = np.dot(rotation_matrix(axis1, theta), base_normal)
-            v = np.dot(rotation_matrix(axis2, phi), v)
-            normal = normalize(v)
-
-            disk = self.fit_disk(normal, point)
-            if curve.pass_through_disk(disk):
-                return disk
-            else:
-                return None
-
-        best_disk = self.fit_disk(init_normal, point)
-        init_radius = best_disk.radius
-        for i in xrange(5):
-            theta = (math.pi / 3) / 4**i
-            # print("Round %d" % i)
-            found_better = True
-            while found_better:
-                found_better = False
-                base_normal  = best_disk.normal
-                axes         = get_axes(base_normal)
-
-                for phi in np.arange(0, 2*math.pi, 0.1 * (i + 1)):
-                    # print theta, phi
-                    disk = get_rotated_disk(base_normal, theta, phi, axes)
-                    if disk and disk.radius < best_disk.radius:
-                        best_disk = disk
-                        best_disk.normal *= np.sign(np.dot(best_disk.normal, init_normal))
-                        found_better = True
-                        # print "Found better!", best_disk.radius
-
-        print "Init radius {}, Optimized: {}".format(init_radius,
-            best_disk.radius)
+    # Same as `get_cut_circles` for planes through `center` with all unit
+    # `normals` (K x 3) at once, given by their orthonormal bases `v1s` and
+    # `v2s`. Spheres are sliced by all K planes in a single vectorized pass.
+    # Returns list of K triples as `get_cut_circles` does.
+    @timed("get_cut_circles")
+    def get_cut_circles_batch(self, normals, v1s, v2s, center):
+        rel       = self.centers - center
+        dists     = np.dot(rel, normals.T)
+        params_t  = np.dot(rel, v1s.T)
+        params_u  = np.dot(rel, v2s.T)
+        radii     = self.radii[:, np.newaxis]
+        cut       = np.abs(dists) < radii
+        cut_radii = np.sqrt(np.where(cut, radii ** 2 - dists ** 2, 0.))
+
+        is_seed = np.zeros(len(self.t), dtype=bool)
+        is_seed[self._get_containing_point_idxs(center)] = True
+
+        cuts = []
+        for k in xrange(len(normals)):
+            idxs = np.flatnonzero(cut[:, k])
+            circ_centers = np.column_stack((params_t[idxs, k], params_u[idxs, k]))
+            circ_radii   = cut_radii[idxs, k]
+            found = connected_circles(circ_centers, circ_radii,
+                                      np.flatnonzero(is_seed[idxs]))
+            cuts.append((idxs[found], circ_centers[found], circ_radii[found]))
+        return cuts
+
+    # Same as `fit_disk` for all `normals` (K x 3) at once, see
+    # `get_cut_circles_batch`.
+    @timed("fit_disks")
+    def fit_disks(self, normals, center):
+        self.n_fits += len(normals)
+        normals = np.array([normalize(n) for n in normals])
+        v1s, v2s = orthonormal_bases(normals)
+
+        disks = []
+        cuts  = self.get_cut_circles_batch(normals, v1s, v2s, center)
+        for k, (idxs, circ_centers, circ_radii) in enumerate(cuts):
+            assert len(circ_radii) > 0
+            t, u, radius = self._get_min_circle(circ_centers, circ_radii, idxs)
+            new_center = center + t * v1s[k] + u * v2s[k]
+            disks.append(Disk(new_center, normals[k], radius))
+        return disks
+
+    # Return parametric center and radius of minimal circle enclosing circles
+    # given by `circ_centers` and `circ_radii`, cut from spheres `sphere_idxs`.
+    #
+    # Consecutive fits cut almost the same spheres, so circles of spheres
+    # supporting the previous result are tried first. If their minimal circle
+    # encloses all the other circles, it is the result, checked by a single
+    # vectorized pass. Otherwise the whole problem is solved, warm started by
+    # the same circles. Hits and fails are recorded by profiling as well.
+    @timed("get_min_sphere2D")
+    def _get_min_circle(self, circ_centers, circ_radii, sphere_idxs):
+        support = np.flatnonzero(np.in1d(sphere_idxs, self.last_support))
+        if len(support) > 0:
+            center, radius, basis = min_enclosing_circle(circ_centers[support],
+                                                         circ_radii[support])
+            excess = np.hypot(circ_centers[:, 0] - center[0],
+                              circ_centers[:, 1] - center[1]) \
+                     + circ_radii - radius
+            if excess.max() <= EPS:
+                self.support_hits += 1
+                record_count("get_min_sphere2D", "support_hits", 1)
+                self.last_support = sphere_idxs[support[basis]]
+                return center[0], center[1], radius
+            self.support_fails += 1
+            record_count("get_min_sphere2D", "support_fails", 1)
+
+        if minball is None:
+            center, radius, basis = min_enclosing_circle(circ_centers,
+                                                         circ_radii, support)
+        else:
+            circles = [minball.Sphere2D(list(c), r)
+                       for c, r in zip(circ_centers, circ_radii)]
+            min_circle = minball.get_min_sphere2D(circles)
+            center, radius = np.array(min_circle.center), min_circle.radius
+            # Circles touching the result, at most three of them are needed.
+            excess = np.hypot(circ_centers[:, 0] - center[0],
+                              circ_centers[:, 1] - center[1]) \
+                     + circ_radii - radius
+            basis = np.argsort(-excess)[:3]
+            basis = basis[excess[basis] > -SUPPORT_TOLERANCE]
+        self.last_support = sphere_idxs[basis]
+        return center[0], center[1], radius
+
+    # Fit disks for all candidate `normals` in `point` and find out which of
+    # them are passed through by `curve`. Returns disks, their radii and
+    # pass-through flags.
+    def evaluate_normals(self, normals, point, curve):
+        disks  = self.fit_disks(normals, point)
+        radii  = np.array([d.radius for d in disks])
+        passes = curve.pass_through_disks(disks)
+        return disks, radii, passes
+
+    # Find disk of minimal radius in `point` passed through by `curve` with
+    # normal in the half-space of `init_normal`, using orientation optimizer
+    # registered in `ORIENTATION_OPTIMIZERS` under given name.
+    @timed("find_minimal_disk")
+    def find_minimal_disk(self, point, init_normal, curve, optimizer="scan"):
+        search = ORIENTATION_OPTIMIZERS[optimizer]
+        n_fits    = self.n_fits
+        best_disk = search(self, point, init_normal, curve)
+
+        print "Optimized radius: {} ({} fits)".format(best_disk.radius,
+            self.n_fits - n_fits)
         assert np.dot(best_disk.normal, init_normal) > 0.
         return best_disk
+
+# Stream all tunnels of PDB file (one per MODEL record), so that files with
+# many tunnels are never held in memory at once.
+def load_tunnels(filename, drop_contained=False):
+    for centers, radii in iter_tunnels(filename):
+        tunnel = Tunnel()
+        tunnel._load_checked(centers, radii, drop_contained)
+        yield tunnel
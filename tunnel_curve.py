@@ -1,61 +1,133 @@
 from linalg import *
-from geometrical_objects import Segment
-from multiprocessing import Process, Queue, cpu_count
+from tunnel import Tunnel, get_min_circle_solver
+from multiprocessing import Pool, cpu_count
+from multiprocessing.sharedctypes import RawArray
+from dir_cache import DirectionCache
+from spatial_index import SegmentBVH
+import profiling
 import numpy as np
-import json
-import os
 
-class TunnelCurve:
-    def __init__(self, tunnel, delta, opts):
-        self.centers = [s.center for s in tunnel.t]
+class TunnelCurve(object):
+    # `warm_start` may hold pair of directions (M x 3) known from similar
+    # tunnel, e.g. previous frame of trajectory, and mask (M) of those that
+    # have to be solved again. Solving then starts from the known direction.
+    def __init__(self, tunnel, delta, opts, warm_start=None):
+        self._init_centerline(tunnel)
         self.dirs = []
         self.delta = delta
-        dump_file = "/tmp/" + opts.filename.replace("/", "") + ".json"
-        load_file = dump_file if os.path.exists(dump_file) else None
+        self.optimizer = opts.optimizer
+        self.n_workers = opts.n_workers or cpu_count()
+        self.fit_counts = []
 
-        if None:
-            with open(load_file) as infile:
-                self.dirs = [np.array(d) for d in json.load(infile)]
+        cache = DirectionCache(opts.cache_dir) if opts.use_cache else None
+        if cache is not None:
+            key  = cache.get_key(tunnel, {"optimizer" : self.optimizer,
+                                          "delta"     : self.delta,
+                                          "solver"    : get_min_circle_solver()})
+            dirs = cache.load(key)
+        if cache is not None and dirs is not None:
+            print "Directions loaded from cache ({}).".format(key)
+        elif warm_start is not None:
+            # Warm started directions depend on the previous tunnel, so they
+            # are never cached.
+            dirs = self._update_dirs(tunnel, *warm_start)
         else:
-            self.dirs = self._compute_dirs(tunnel)
+            dirs = self._compute_dirs(tunnel)
+            if cache is not None:
+                cache.store(key, dirs)
+        self.dirs = [np.array(d, dtype=float) for d in dirs]
+        self._dirs = np.array(self.dirs).reshape(-1, 3)
+
+    # Curve consisting only of tunnel centerline, without directions. Enough
+    # for pass-through tests in `Tunnel.find_minimal_disk`.
+    @classmethod
+    def centerline(cls, tunnel):
+        curve = cls.__new__(cls)
+        curve._init_centerline(tunnel)
+        return curve
 
-        if None:
-            with open(dump_file, 'w') as outfile:
-                json.dump([list(d) for d in self.dirs], outfile)
+    def _init_centerline(self, tunnel):
+        self.centers = [s.center for s in tunnel.t]
+        # Centerline as arrays of points and segment directions.
+        self._points   = np.array(self.centers, dtype=float)
+        self._seg_dirs = np.diff(self._points, axis=0)
+        self._seg_lens = np.sqrt((self._seg_dirs ** 2).sum(axis=1))
+        # Arc length of centerline from the first center to i-th center.
+        self._arc_lens = np.concatenate(([0.], np.cumsum(self._seg_lens)))
+        self._segment_bvh = SegmentBVH(self._points)
 
+    # Compute direction of minimal disk in every tunnel center but the last.
+    # Centers are split into chunks solved by a pool of `n_workers` processes
+    # sharing read-only tunnel arrays. Results are collected in order of
+    # centers.
     def _compute_dirs(self, tunnel):
-        def get_minimal(task_q, result_q, tunnel):
-            while True:
-                task = task_q.get()
-                if task is None:
-                    task_q.put(None)
-                    break
-                center, normal, idx = task
-                result_q.put((idx, tunnel.find_minimal_disk(center, normal, self).normal))
-
-        N_CORES = cpu_count()
-        task_q = Queue()
-        result_q = Queue()
-        processes = [Process(target=get_minimal, args=(task_q, result_q, tunnel))
-            for __ in xrange(N_CORES)
-        ]
+        tasks = [(i, None) for i in xrange(len(self.centers) - 1)]
+        return self._solve_dirs(tunnel, tasks)
 
+    # Reuse `prev_dirs` except for centers flagged in `changed`, which are
+    # solved again starting from their previous direction.
+    def _update_dirs(self, tunnel, prev_dirs, changed):
+        assert len(prev_dirs) == len(self.centers) - 1
+        tasks = [(i, prev_dirs[i]) for i in np.flatnonzero(changed)]
+        print "Reusing {} of {} directions.".format(len(prev_dirs) - len(tasks),
+                                                    len(prev_dirs))
+        return self._solve_dirs(tunnel, tasks, prev_dirs)
+
+    # Solve `tasks`, pairs of center index and initial normal (direction to
+    # the next center if None). Directions of centers without task are taken
+    # from `known_dirs`.
+    @profiling.timed("compute_dirs")
+    def _solve_dirs(self, tunnel, tasks, known_dirs=None):
         dirs_count = len(self.centers) - 1
-        for i in xrange(dirs_count):
-            n = normalize(self.centers[i + 1] - self.centers[i])
-            task_q.put((self.centers[i], n, i))
-
-        task_q.put(None)
-        for p in processes:
-            p.start()
-        for p in processes:
-            p.join()
-        dirs = [None for __ in xrange(dirs_count)]
-        while not result_q.empty():
-            idx, normal = result_q.get()
-            dirs[idx] = normal
+        n_chunks   = min(len(tasks), 4 * self.n_workers)
+        # Interleaved chunks spread expensive parts of the tunnel evenly among
+        # workers.
+        chunks     = [tasks[i::n_chunks] for i in xrange(n_chunks)]
+
+        if self.n_workers <= 1 or len(tasks) <= 1:
+            _set_worker_state(tunnel, self, self.optimizer)
+            results = map(_solve_chunk, chunks)
+        else:
+            centers = _to_shared(tunnel.centers)
+            radii   = _to_shared(tunnel.radii)
+            pool    = Pool(self.n_workers, _init_worker,
+                           (centers, radii, self.optimizer,
+                            profiling.is_enabled()))
+            try:
+                results = []
+                for chunk_results, stats in pool.map(_solve_remote_chunk,
+                                                     chunks, chunksize=1):
+                    results.append(chunk_results)
+                    profiling.merge(stats)
+                pool.close()
+            except:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+
+        if known_dirs is None:
+            dirs = [None for __ in xrange(dirs_count)]
+        else:
+            dirs = list(known_dirs)
+        self.fit_counts = [0 for __ in xrange(dirs_count)]
+        for chunk_results in results:
+            for idx, normal, n_fits in chunk_results:
+                dirs[idx] = normal
+                self.fit_counts[idx] = n_fits
+        self._report_fit_counts()
         return dirs
 
+    # Print number of disk fits needed to compute direction in tunnel centers.
+    def _report_fit_counts(self):
+        counts = self.fit_counts
+        if not counts:
+            return
+        print "Directions computed by '{}' with {} fits ({:.1f} per center, " \
+            "min {}, max {}).".format(self.optimizer, sum(counts),
+                                      float(sum(counts)) / len(counts),
+                                      min(counts), max(counts))
+
 
     # Returns weighted(smoothen) dir of tunnel in given point.
     # `active_segment_idx` is index of segment between tunnel centers.
@@ -68,56 +140,99 @@ class TunnelCurve:
     #     w2 = d / centers_dist
 
     #     return normalize(self.dirs[i]) * w1 + normalize(self.dirs[i + 1]) * w2
+    #
+    # Only directions whose centers are closer than `self.delta` contribute.
+    # Distances are monotonic in center index on both sides of the active
+    # segment, so the contributing window is found by binary search over
+    # cumulative arc lengths.
     def get_weighted_dir(self, active_segment_idx, d):
         max_dist = self.delta
-        i = active_segment_idx
-        cent_dist = []
-        w_dir = np.array([0.,0.,0.])
+        i   = active_segment_idx
+        arc = self._arc_lens
 
-        for j in xrange(len(self.dirs)):
-            dist = self._center_distance_from_point(j, i, d)
-            if dist < max_dist:
-                w_dir += self.dirs[j] * (max_dist - dist) ** 3
+        # Centers up to the active segment, see `_center_distance_from_point`.
+        first  = np.searchsorted(arc[:i + 1], arc[i] + d - max_dist, side='right')
+        before = arc[i] - arc[first:i + 1] + d
+        # Centers behind the active segment.
+        behind_offset = arc[i + 1] + self._seg_lens[i] - d
+        count  = np.searchsorted(arc[i + 2:len(self.dirs) + 1],
+                                 max_dist + behind_offset, side='left')
+        behind = arc[i + 2:i + 2 + count] - behind_offset
 
+        dists   = np.concatenate((before, behind))
+        weights = (max_dist - dists) ** 3
+        w_dir   = np.dot(weights, self._dirs[first:i + 1 + count])
         return normalize(w_dir)
 
     def _get_normal_weights(self, active_segment_idx, d, r):
         pass
 
     def _center_distance_from_point(self, center_idx, active_segment_idx, d):
-        c    = center_idx
-        step = np.sign(active_segment_idx - center_idx)
-        dist = 0.
+        c   = center_idx
+        i   = active_segment_idx
+        arc = self._arc_lens
 
-        while c != active_segment_idx:
-            dist += np.linalg.norm(self.centers[c + 1] - self.centers[c])
-            c += step
-
-        if step >= 0:
-            dist += d
+        if c <= i:
+            return arc[i] - arc[c] + d
         else: # subtract extra distance.
-            dist -= np.linalg.norm(self.centers[c + 1] - self.centers[c]) - d
-
-        return dist
+            return arc[c + 1] - arc[i + 1] - self._seg_lens[i] + d
 
     # Finds whether given `disk` is passed through by given curve in topological
     # sense.
     def pass_through_disk(self, disk):
-        first_pass_sgn = None
-        last_pass_sgn = None
-        split = None
-
-        for i in xrange(len(self.centers) - 1):
-            seg = Segment(self.centers[i], self.centers[i + 1])
-            inter = seg.intersection_disk(disk)
-
-            if inter is not None:
-                d = self.centers[i + 1] - self.centers[i]
-                d_sgn = np.sign(np.dot(disk.normal, d))
-                if disk.contains(self.centers[i + 1]):
-                    split = split or d
+        return self.pass_through_disks([disk])[0]
+
+    # Vectorized `pass_through_disk` for a list of `disks`. Only segments whose
+    # bounding boxes reach bounding sphere of a disk are tested, all of them in
+    # a single vectorized pass. The few segments actually crossing a disk are
+    # then processed one by one.
+    def pass_through_disks(self, disks):
+        centers = np.array([d.center for d in disks])
+        normals = np.array([d.normal for d in disks])
+        radii   = np.array([d.radius for d in disks])
+
+        disk_idxs, seg_idxs = self._segment_bvh.query_balls(centers,
+                                                            radii + f_error)
+        c = centers[disk_idxs]
+        n = normals[disk_idxs]
+        r = radii[disk_idxs]
+        starts   = self._points[seg_idxs]
+        ends     = self._points[seg_idxs + 1]
+        seg_dirs = self._seg_dirs[seg_idxs]
+
+        # Signed distances of segment end points from disk planes and
+        # projections of segment directions on disk normals.
+        offsets    = (c * n).sum(axis=1)
+        start_dist = (starts * n).sum(axis=1) - offsets
+        end_dist   = (ends * n).sum(axis=1) - offsets
+        dir_dots   = (seg_dirs * n).sum(axis=1)
+        crossing = np.abs(dir_dots) > f_error
+        with np.errstate(divide='ignore', invalid='ignore'):
+            params = np.where(crossing, -start_dist / dir_dots, 0.)
+        # Parameter tolerance equivalent to `Segment.contains`.
+        tol  = f_error / (2 * self._seg_lens[seg_idxs])
+        hits = crossing & (params > -tol) & (params < 1 + tol)
+
+        inters = starts + params[:, np.newaxis] * seg_dirs
+        hits  &= ((inters - c) ** 2).sum(axis=1) <= (r + f_error) ** 2
+        # Whether disk contains end point of segment.
+        contains_end = (np.abs(end_dist) < f_error) \
+            & (((ends - c) ** 2).sum(axis=1) <= (r + f_error) ** 2)
+
+        hits = np.flatnonzero(hits)
+        passes = np.zeros(len(disks), dtype=bool)
+        bounds = np.searchsorted(disk_idxs[hits], np.arange(len(disks) + 1))
+        for k in xrange(len(disks)):
+            first_pass_sgn = None
+            last_pass_sgn = None
+            split = None
+
+            for h in hits[bounds[k]:bounds[k + 1]]:
+                d_sgn = np.sign(dir_dots[h])
+                if contains_end[h]:
+                    split = split if split is not None else d_sgn
                 elif split is not None:
-                    sgn = d_sgn * np.sign(np.dot(disk.normal, split))
+                    sgn = d_sgn * split
                     if sgn > 0:
                         first_pass_sgn = first_pass_sgn or d_sgn
                         last_pass_sgn = d_sgn
@@ -125,4 +240,50 @@ class TunnelCurve:
                 else:
                     first_pass_sgn = first_pass_sgn or d_sgn
                     last_pass_sgn = d_sgn
-        return first_pass_sgn is not None and first_pass_sgn == last_pass_sgn
+            passes[k] = first_pass_sgn is not None \
+                and first_pass_sgn == last_pass_sgn
+        return passes
+
+
+# Worker side of `TunnelCurve._compute_dirs`. Every worker process holds its
+# own tunnel and centerline built on top of shared arrays.
+_worker_state = None
+
+def _to_shared(array):
+    shared = RawArray('d', array.size)
+    np.frombuffer(shared, dtype=float)[:] = array.ravel()
+    return shared
+
+def _init_worker(centers, radii, optimizer, profile):
+    profiling.enable(profile)
+    profiling.reset()
+    tunnel = Tunnel()
+    tunnel.load_from_arrays(np.frombuffer(centers, dtype=float).reshape(-1, 3),
+                            np.frombuffer(radii, dtype=float))
+    _set_worker_state(tunnel, TunnelCurve.centerline(tunnel), optimizer)
+
+def _set_worker_state(tunnel, curve, optimizer):
+    global _worker_state
+    _worker_state = (tunnel, curve, optimizer)
+
+def _solve_chunk(tasks):
+    tunnel, curve, optimizer = _worker_state
+    results = []
+    for i, init_normal in tasks:
+        normal = normalize(tunnel.centers[i + 1] - tunnel.centers[i])
+        if init_normal is not None:
+            # Keep orientation of the tunnel.
+            if np.dot(init_normal, normal) < 0.:
+                init_normal = -init_normal
+            normal = normalize(init_normal)
+        n_fits = tunnel.n_fits
+        disk   = tunnel.find_minimal_disk(tunnel.centers[i], normal, curve,
+                                          optimizer=optimizer)
+        results.append((i, disk.normal, tunnel.n_fits - n_fits))
+    return results
+
+# Solve chunk in worker process, returning also profiling statistics of the
+# worker.
+def _solve_remote_chunk(tasks):
+    results = _solve_chunk(tasks)
+    return results, profiling.take_stats()
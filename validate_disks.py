@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""Validation of discretized tunnel.
+
+Checks the whole disk sequence at once: consecutive disks are closer than
+delta, center of every disk lies ahead of the previous disk, and every disk
+lies in the tunnel and encloses circles cut from spheres containing its
+center. Disks whose vertices are behind the previous disk are reported as
+well, but only as a warning, since digging enforces it only outside sharp
+turns.
+
+Usage:
+  validate_disks.py <tunnel-filename> <dsd-filename> [--delta <delta>] [--tolerance <tol>]
+
+Options:
+  -h --help                         Show this help.
+  <tunnel-filename>                 Tunnel in PDB format.
+  <dsd-filename>                    Disks of the tunnel in dsd or binary format.
+  --delta <delta>                   Maximal distance between disks [default: 0.3].
+  --tolerance <tol>                 Tolerance of all checks, disks in dsd files are
+                                    rounded [default: 1e-5].
+
+"""
+
+import sys
+import numpy as np
+
+from disk_format import read_disks
+from linalg import get_radius_vectors_array
+from pdb_reader import read_tunnel
+
+# Number of disk-sphere pairs processed at once by `check_coverage`.
+COVERAGE_CHUNK = 1000000
+# Checks whose failures do not make the disks invalid.
+WARNING_CHECKS = ("follower",)
+
+# Indices i of consecutive disks i, i + 1 of `DiskArray` farther than `delta`.
+def check_distances(disks, delta, tolerance):
+    dists = disks.consecutive_dists()
+    return np.flatnonzero(dists >= delta + tolerance)
+
+# Indices i of consecutive disks such that center of disk i + 1 is not ahead
+# of disk i.
+def check_order(disks, tolerance):
+    rel  = disks.centers[1:] - disks.centers[:-1]
+    dots = (rel * disks.normals[:-1]).sum(axis=1)
+    return np.flatnonzero(dots <= tolerance)
+
+# Indices i of consecutive disks such that disk i + 1 does not follow disk i,
+# see `is_follower`.
+def check_followers(disks, tolerance):
+    __, new_dirs = get_radius_vectors_array(disks.normals[:-1], disks.radii[:-1],
+                                            disks.normals[1:], disks.radii[1:])
+    rel = disks.centers[1:] - disks.centers[:-1]
+    dots_1 = ((rel + new_dirs) * disks.normals[:-1]).sum(axis=1)
+    dots_2 = ((rel - new_dirs) * disks.normals[:-1]).sum(axis=1)
+    return np.flatnonzero((dots_1 <= -tolerance) | (dots_2 <= -tolerance))
+
+# Indices of disks whose center lies outside the tunnel given by sphere
+# `centers` and `radii`, or which do not enclose circles cut from spheres
+# containing their center.
+def check_coverage(disks, centers, radii, tolerance):
+    failed = []
+    chunk  = max(COVERAGE_CHUNK // max(len(radii), 1), 1)
+    for start in xrange(0, len(disks), chunk):
+        stop = min(start + chunk, len(disks))
+        # Disks x spheres.
+        rel     = centers[np.newaxis] - disks.centers[start:stop, np.newaxis]
+        dists   = (rel * disks.normals[start:stop, np.newaxis]).sum(axis=2)
+        sq_rel  = (rel ** 2).sum(axis=2)
+        sq_radii = radii[np.newaxis] ** 2
+        inside  = sq_rel < sq_radii
+
+        cut_radii = np.sqrt(np.maximum(sq_radii - dists ** 2, 0.))
+        offsets   = np.sqrt(np.maximum(sq_rel - dists ** 2, 0.))
+        excess    = offsets + cut_radii - disks.radii[start:stop, np.newaxis]
+        enclosed  = ~inside | (excess <= tolerance)
+        ok = inside.any(axis=1) & enclosed.all(axis=1)
+        failed.extend(start + np.flatnonzero(~ok))
+    return np.array(failed, dtype=int)
+
+# Run all checks of `DiskArray` in tunnel given by sphere `centers` and
+# `radii`. Returns dict of check name and indices of failed disks.
+def validate(disks, centers, radii, delta, tolerance=1e-5):
+    return {"distance" : check_distances(disks, delta, tolerance),
+            "order"    : check_order(disks, tolerance),
+            "follower" : check_followers(disks, tolerance),
+            "coverage" : check_coverage(disks, centers, radii, tolerance)}
+
+
+if __name__ == '__main__':
+    from docopt import docopt
+
+    arguments = docopt(__doc__)
+    centers, radii = read_tunnel(arguments["<tunnel-filename>"])
+    disks = read_disks(arguments["<dsd-filename>"])
+    delta = float(arguments["--delta"])
+    failures = validate(disks, centers, radii, delta,
+                        float(arguments["--tolerance"]))
+
+    print "{} disks, maximal distance of consecutive disks {}.".format(
+        len(disks), disks.consecutive_dists().max() if len(disks) > 1 else 0.)
+    invalid = False
+    for name, idxs in sorted(failures.iteritems()):
+        if len(idxs) == 0:
+            print "{}: OK".format(name)
+            continue
+        warning = name in WARNING_CHECKS
+        invalid = invalid or not warning
+        print "{}: {} {}, disks {}".format(name, len(idxs),
+            "warnings" if warning else "failed",
+            ", ".join(str(i) for i in idxs[:20]))
+    sys.exit(1 if invalid else 0)